@@ -1,6 +1,6 @@
 #!/usr/bin/env/python3
 ''' Biomarker-Partnership data dictionary processor. Reads in the data dictionary JSON and converts it to 
-a JSON validation schema. 
+a JSON validation schema, along with a standalone schema for a single biomarker record. 
 
 Usage: python process_dictionary.py [options]
 
@@ -9,6 +9,9 @@ Usage: python process_dictionary.py [options]
 
     Optional arguments: 
         -o --output         alternate output path for dumping the schema (for testing)
+        -i --item_output    alternate output path for dumping the item schema (for testing)
+        --profile           profile the run with cProfile, the stats and a summary are written to the logs directory
+        --profile-memory    with --profile, also trace the memory allocations with tracemalloc
         -h --help           show the help message and exit
         -v --version        show current version number and exit
 '''
@@ -17,13 +20,22 @@ import json
 import argparse
 import sys
 import os 
+import copy
+import contextlib
+from typing import Iterator
 
 _CONF_KEY = 'schema_generation'
+# sub-objects that are factored out into the item schema's definitions
+SHARED_DEFINITIONS = ('evidence_source', 'citation')
+# number of functions (and memory allocation sites) listed in the profile summary
+PROFILE_TOP_N = 30
 _version = None 
 _id_prefix = None
 _output_path = None
 _output_file = None
+_item_output_file = None
 _schema = None
+_profile_prefix = None
 
 def user_args() -> None:
     ''' Parses the command line arguments. 
@@ -38,6 +50,9 @@ def user_args() -> None:
     parser.add_argument('file_path', help = 'filepath of the data dictionary JSON')
     parser.add_argument('-v', '--version', action = 'version', version = f'%(prog)s {_version}')
     parser.add_argument('-o', '--output', type = str, help = 'Output file path', default = None)
+    parser.add_argument('-i', '--item_output', type = str, help = 'Item schema output file path', default = None)
+    parser.add_argument('--profile', action = 'store_true', help = 'profile the run with cProfile, the sorted stats (.pstats) and a summary of the top functions (.txt) are written to the logs directory')
+    parser.add_argument('--profile-memory', action = 'store_true', help = 'with --profile, also trace the memory allocations with tracemalloc and add the peak memory and the top allocation sites to the summary')
 
     # print out help if script is called with no input arguments
     if len(sys.argv) <= 1:
@@ -52,16 +67,21 @@ def user_args() -> None:
     if options.output:
         custom_output_flag = True
         validate_filepath(os.path.split(options.output)[0], 'output')
+    if options.item_output:
+        validate_filepath(os.path.split(options.item_output)[0], 'output')
     # check that the user passed input filepath exists
     validate_filepath(options.file_path, 'input')
 
-    if custom_output_flag:
-        generate_schema_json(options.file_path, custom_output_flag = custom_output_flag, custom_output_path = options.output)
-    else:
-        generate_schema_json(options.file_path)
+    with profile_run(_profile_prefix, options.profile, options.profile_memory):
+        if custom_output_flag:
+            generate_schema_json(options.file_path, custom_output_flag = custom_output_flag, custom_output_path = options.output, custom_item_output_path = options.item_output)
+        else:
+            generate_schema_json(options.file_path, custom_item_output_path = options.item_output)
 
-def generate_schema_json(filepath: str, custom_output_flag: bool = False, custom_output_path: str = None) -> None:
-    ''' Converts the data dictionary into a JSON schema. 
+def generate_schema_json(filepath: str, custom_output_flag: bool = False, custom_output_path: str = None, custom_item_output_path: str = None) -> None:
+    ''' Converts the data dictionary into a JSON schema. The standalone item schema is written 
+    alongside it to the schema directory, or to the custom item output path if passed (when a 
+    custom output path is passed without a custom item output path, the item schema is not written).
 
     Parameters
     ----------
@@ -71,6 +91,8 @@ def generate_schema_json(filepath: str, custom_output_flag: bool = False, custom
         Flag that determines if a custom output path was passed.
     custom_output_path: str (default None)
         Custom output path to write to. 
+    custom_item_output_path: str (default None)
+        Custom output path to write the item schema to.
     '''
 
     # construct root of json schema 
@@ -140,6 +162,69 @@ def generate_schema_json(filepath: str, custom_output_flag: bool = False, custom
     with open(file_dump_path, 'w') as f:
         json.dump(biomarker_schema, f)
 
+    # write out the item schema
+    if custom_item_output_path:
+        item_dump_path = custom_item_output_path
+    elif not custom_output_flag:
+        item_dump_path = f'{_output_path}/{_item_output_file}'
+    else:
+        return
+    item_schema = generate_item_schema(biomarker_schema['items'])
+    with open(item_dump_path, 'w') as f:
+        json.dump(item_schema, f, indent = 2)
+
+def generate_item_schema(items_schema: dict) -> dict:
+    ''' Builds the standalone schema for a single biomarker record from the array schema's items. 
+    The shared sub-objects (see SHARED_DEFINITIONS) are moved to the draft-07 definitions and 
+    referenced, identical sub-objects share a single definition.
+
+    Parameters
+    ----------
+    items_schema: dict
+        The items schema of the full biomarker array schema.
+
+    Returns
+    -------
+    dict
+        The item schema.
+    '''
+    item_schema = {
+        '$schema': _schema,
+        '$id': _id_prefix + f'v{_version}/{_item_output_file}',
+        'title': _item_output_file,
+        **copy.deepcopy(items_schema),
+        'definitions': {}
+    }
+    extract_definitions(item_schema['properties'], [], item_schema['definitions'])
+    return item_schema
+
+def extract_definitions(properties: dict, path: list, definitions: dict) -> None:
+    ''' Recursively replaces the shared sub-object schemas in the properties with references to 
+    definitions. Definitions are named after the property path (e.g. biomarker_component_evidence_source) 
+    unless an identical definition already exists.
+
+    Parameters
+    ----------
+    properties: dict
+        The properties schema to process.
+    path: list
+        The property names leading to the properties.
+    definitions: dict
+        The item schema's definitions to add the shared sub-object schemas to.
+    '''
+    for key, property_schema in properties.items():
+        # handle the children of object and array elements first
+        children = property_schema.get('properties') or property_schema.get('items', {}).get('properties')
+        if children:
+            extract_definitions(children, path + [key], definitions)
+        if key not in SHARED_DEFINITIONS:
+            continue
+        name = next((name for name, definition in definitions.items() if definition == property_schema), None)
+        if name is None:
+            name = '_'.join(path + [key])
+            definitions[name] = property_schema
+        properties[key] = {'$ref': f'#/definitions/{name}'}
+
 def process_primitive_item(item: dict) -> dict:
     ''' Function to handle generating the schema portion for primitive elements. 
 
@@ -274,6 +359,57 @@ def handle_exclusions(property_key: str, property_value: dict, schema: dict) ->
     '''
     pass 
 
+@contextlib.contextmanager
+def profile_run(profile_prefix: str, enabled: bool = True, memory: bool = False, top: int = PROFILE_TOP_N) -> Iterator[None]:
+    ''' Profiles the code run inside the context with cProfile (and optionally tracemalloc). The raw 
+    stats are written to `<profile_prefix>_profile.pstats` and a summary of the top functions by 
+    cumulative and internal time (and the peak memory and top allocation sites) to 
+    `<profile_prefix>_profile.txt`.
+
+    Parameters
+    ----------
+    profile_prefix: str
+        Filepath prefix of the profile files.
+    enabled: bool (default True)
+        Whether to profile, if False the context does nothing.
+    memory: bool (default False)
+        Whether to also trace the memory allocations with tracemalloc.
+    top: int (default PROFILE_TOP_N)
+        Number of functions and allocation sites listed in the summary.
+    '''
+    if not enabled:
+        yield
+        return
+    import cProfile
+    import pstats
+    import tracemalloc
+    if memory:
+        tracemalloc.start()
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        snapshot, peak = None, None
+        if memory:
+            snapshot = tracemalloc.take_snapshot()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        stats_filepath = f'{profile_prefix}_profile.pstats'
+        summary_filepath = f'{profile_prefix}_profile.txt'
+        profiler.dump_stats(stats_filepath)
+        with open(summary_filepath, 'w') as f:
+            stats = pstats.Stats(stats_filepath, stream = f)
+            for sort_key in ('cumulative', 'tottime'):
+                f.write(f'Top {top} functions by {sort_key} time:\n')
+                stats.sort_stats(sort_key).print_stats(top)
+            if memory:
+                f.write(f'Peak traced memory: {peak / 1_000_000:.1f} MB\n\nTop {top} allocation sites at the end of the run:\n')
+                for stat in snapshot.statistics('lineno')[:top]:
+                    f.write(f'{stat}\n')
+        print(f'Profile written to {stats_filepath} and {summary_filepath}.')
+
 def validate_filepath(filepath: str, mode: str) -> None:
     ''' Validates the filepaths for the user inputted source path and
     the destination path. 
@@ -301,7 +437,9 @@ def main() -> None:
     global _id_prefix
     global _output_path
     global _output_file
+    global _item_output_file
     global _schema
+    global _profile_prefix
 
     # grab configuration variables from config file  
     with open('../conf.json', 'r') as f:
@@ -310,7 +448,11 @@ def main() -> None:
         _id_prefix = config[_CONF_KEY]['raw_url_prefix']
         _output_path = f"{config[_CONF_KEY]['output_path']}/v{_version}/"
         _output_file = config[_CONF_KEY]['output_file']
+        _item_output_file = config[_CONF_KEY]['item_output_file']
         _schema = config[_CONF_KEY]['schema']
+        # this script doesn't log, the profile is written to the logs directory of the other scripts
+        log_dir = os.path.split(config['validation']['log_path'])[0]
+        _profile_prefix = os.path.join(log_dir if os.path.isdir(log_dir) else '.', 'schema_generation')
     
     # make sure the schema output directory exists
     validate_filepath(_output_path, 'output')
@@ -0,0 +1,48 @@
+''' Data model schema helpers shared by the data validator (validate_data.py) and the validation of 
+the data conversion scripts (src/data_conversion/fmt_lib/schema_validation.py, which loads this module 
+from the schema directory set in the config file). Only depends on the standard library so it is 
+cheap to load.
+'''
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from jsonschema.exceptions import ValidationError
+
+def get_item_schema(schema_data: dict) -> dict:
+    ''' Gets the schema for a single biomarker record. If the schema describes the full data 
+    array, the `items` schema is used (carrying over the draft and any shared definitions).
+
+    Parameters
+    ----------
+    schema_data: dict
+        The data model schema.
+
+    Returns
+    -------
+    dict
+        The schema for a single record.
+    '''
+    if schema_data.get('type') != 'array' or 'items' not in schema_data:
+        return schema_data
+    item_schema = dict(schema_data['items'])
+    for key in ('$schema', '$defs', 'definitions'):
+        if key in schema_data and key not in item_schema:
+            item_schema[key] = schema_data[key]
+    return item_schema
+
+def format_error(error: 'ValidationError') -> str:
+    ''' Formats a validation error with the path to the failing element.
+
+    Parameters
+    ----------
+    error: ValidationError
+        The validation error.
+
+    Returns
+    -------
+    str
+        The formatted error message.
+    '''
+    path = '/'.join(str(element) for element in error.absolute_path)
+    return f"{path if path else '<root>'}: {error.message}"
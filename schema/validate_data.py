@@ -4,34 +4,68 @@
 Usage: python validate_data.py [options]
 
     Positional arguments:
-        data_filepath       filepath of the input data file to validate (accepts tab delimited tsv or txt files or JSON)
+        data_filepath       filepath of the input data file to validate (accepts tab delimited tsv or txt files, JSON, or JSON Lines)
         schema_filepath     filepath to the schema file to validate against
     
     Optional arguments
         -o --output         whether to save the intermediate json (store_true argument)
         -c --chunk          chunk size to process the source data
+        -w --workers        number of worker processes to validate the records with (default 1)
+        -b --backend        validation backend, jsonschema or fast (generated validation code, requires fastjsonschema)
+        -i --incremental    only validate records that changed since the last run (store_true argument)
+        --profile           profile the run with cProfile, the stats and a summary are written next to the log file (store_true argument)
+        --profile-memory    with --profile, also trace the memory allocations with tracemalloc (store_true argument)
         -h --help           show the help message and exit
         -v --version        show current version number and exit 
 '''
 
 import json
-from jsonschema import validate, ValidationError
+import hashlib
+import textwrap
+import sqlite3
+from jsonschema.validators import validator_for
+from jsonschema.protocols import Validator
+import ijson
 import argparse
 import sys 
 import os 
 import logging
+import contextlib
 import pandas as pd
+from multiprocessing import Pool
+from collections import deque
+from itertools import islice
+from functools import partial
+from typing import Iterable, Iterator, Callable, Optional
+from schema_utils import get_item_schema, format_error
 
 _VAL_KEY = 'validation'
 _version = None 
-
-def user_args(intermediate_path: str = None) -> None:
+# number of records sent to a worker process at a time
+WORKER_BATCH_SIZE = 1_000
+# validation backends
+BACKENDS = ('jsonschema', 'fast')
+# filename of the incremental validation result store (in the cache directory)
+RESULT_STORE_FILENAME = 'validation_results.sqlite'
+# number of new results to insert before committing to the result store
+RESULT_STORE_COMMIT_SIZE = 10_000
+# number of functions (and memory allocation sites) listed in the profile summary
+PROFILE_TOP_N = 30
+# compiled record validator and fast check of a worker process
+_worker_validator = None
+_worker_fast_check = None
+
+def user_args(intermediate_path: str = None, cache_path: str = None, log_path: str = None) -> None:
     ''' Parses the command line arguments.
 
     Parameters
     ----------
     intermediate_path: str
         Filepath to store the intermediate JSON. 
+    cache_path: str
+        Directory to cache the generated validation code in.
+    log_path: str
+        Filepath of the log file, the profile is written next to it.
     '''
 
     # argument parser
@@ -43,7 +77,12 @@ def user_args(intermediate_path: str = None) -> None:
     parser.add_argument('data_filepath', help = 'filepath of the input file to validate (tsv, txt, or json)')
     parser.add_argument('schema_filepath', help = 'filepath of the schema file to validate against (json)')
     parser.add_argument('-o', '--output', action = 'store_true', help = 'whether to save the intermediate json, only applicable if input file is tsv or txt format (store_true argument)')
-    # parser.add_argument('-c', '--chunk', action = 'store', help = 'chunk size to process the source data, only applicable if input file is tsv or txt format')
+    parser.add_argument('-c', '--chunk', action = 'store', help = 'chunk size to process the source data, only applicable if input file is tsv or txt format')
+    parser.add_argument('-w', '--workers', action = 'store', type = int, default = 1, help = 'number of worker processes to validate the records with (default 1)')
+    parser.add_argument('-b', '--backend', action = 'store', choices = BACKENDS, default = 'jsonschema', help = 'validation backend, fast generates specialized validation code from the schema (requires fastjsonschema, default jsonschema)')
+    parser.add_argument('-i', '--incremental', action = 'store_true', help = 'only validate records that are new or changed since the last run, reusing the stored results for the rest (store_true argument)')
+    parser.add_argument('--profile', action = 'store_true', help = 'profile the run with cProfile, the sorted stats (.pstats) and a summary of the top functions (.txt) are written next to the log file (store_true argument)')
+    parser.add_argument('--profile-memory', action = 'store_true', help = 'with --profile, also trace the memory allocations with tracemalloc and add the peak memory and the top allocation sites to the summary (store_true argument)')
     parser.add_argument('-v', '--version', action = 'version', version = f'%(prog)s {_version}')
 
     # print out help if script is called with no arguments 
@@ -53,13 +92,15 @@ def user_args(intermediate_path: str = None) -> None:
     options = parser.parse_args()
 
     # log the user passed arguments
-    logging.info(f'Arguments passed:\ndata_filepath = {options.data_filepath}\nschema_filepath = {options.schema_filepath}\noutput flag = {options.output}')
+    logging.info(f'Arguments passed:\ndata_filepath = {options.data_filepath}\nschema_filepath = {options.schema_filepath}\noutput flag = {options.output}\nchunk = {options.chunk}\nworkers = {options.workers}\nbackend = {options.backend}\nincremental = {options.incremental}\nprofile = {options.profile}\nprofile_memory = {options.profile_memory}')
 
     # check that the correct file types were passed
-    if not (options.data_filepath.endswith('.tsv') or options.data_filepath.endswith('.txt') or options.data_filepath.endswith('.json')):
-        raise ValueError(f'The source data filepath must be of type .tsv, .txt, or .json.')
+    if not options.data_filepath.endswith(('.tsv', '.txt', '.json', '.jsonl')):
+        raise ValueError(f'The source data filepath must be of type .tsv, .txt, .json, or .jsonl.')
     if not options.schema_filepath.endswith('.json'):
         raise ValueError(f'The schema must be of type .json.')
+    if options.workers < 1:
+        raise ValueError(f'Workers value must be a positive integer.')
     
     # check that the user passed input filepath exists
     validate_filepath(options.data_filepath, 'input')
@@ -82,52 +123,65 @@ def user_args(intermediate_path: str = None) -> None:
                 chunk_size = int(options.chunk)
             except ValueError:
                 raise ValueError(f'Chunk value must be of type integer.')
+            if chunk_size < 1:
+                raise ValueError(f'Chunk value must be a positive integer.')
 
-    validate_data(options.data_filepath, source_type_json, options.schema_filepath, output_flag, intermediate_path, chunk_size)
+    profile_prefix = os.path.splitext(log_path)[0] if log_path else 'validation'
+    with profile_run(profile_prefix, options.profile, options.profile_memory):
+        validate_data(options.data_filepath, source_type_json, options.schema_filepath, output_flag, intermediate_path, chunk_size, options.workers, options.backend, cache_path, options.incremental)
 
-def convert_to_json(source: str, output_flag: bool = False, intermediate_path: str = None, chunk_size: int = None) -> dict:
-    ''' Converts the input data to a JSON file for schema validation. In cases where the source 
-    data is extremely large, the output_flag and chunk_size parameters can be used to prevent 
-    hitting the system's memory limit.
+def stream_tsv_records(source: str, chunk_size: int = None, intermediate_path: str = None) -> Iterator[dict]:
+    ''' Lazily yields the rows of the input data as JSON records for schema validation. The rows are 
+    converted straight to native Python values (empty cells become None) without serializing to a 
+    JSON string first. In cases where the source data is extremely large, the chunk_size parameter 
+    can be used to only hold one chunk of rows in memory at a time.
 
     Parameters
     ----------
     source: str 
-        Filepath of the source file to convert to a JSON file for validation.
-    output_flag: bool
-        Whether to save the intermediate json (optional, default False).
-    intermediate_path: str
-        Filepath to store the intermediate JSON. 
+        Filepath of the source file to convert to JSON records for validation.
     chunk_size: int 
         Chunk size to process the source data with (optional, default None).
+    intermediate_path: str
+        Filepath to save the intermediate JSON to (optional, default None, not saved). 
 
     Returns
     -------
-    dict    
-        JSON for the converted data sheet to validate. 
+    Iterator[dict]
+        Iterator over the converted records. 
     '''
 
-    json_data = []
-
     # handle parsing by chunk
-    if chunk_size: 
-        for chunk in pd.read_csv(source, delimiter = '\t', chunksize = chunk):
-            chunk_json = chunk.to_json(orient = 'records')
-            json_data.extend(json.loads(chunk_json))
+    if chunk_size:
+        chunks = pd.read_csv(source, delimiter = '\t', chunksize = chunk_size)
     # normal parsing 
-    else: 
-        df = pd.read_csv(source, delimiter = '\t')
-        json_string = df.to_json(orient = 'records')
-        json_data = json.loads(json_string)
-
-    if output_flag:
-        with open(intermediate_path, 'w', encoding = 'utf-8') as f:
-            json.dump(json_data, f, indent = 4)
-    
-    return json_data
+    else:
+        chunks = [pd.read_csv(source, delimiter = '\t')]
 
-def validate_data(source: str, source_type_json: bool, schema: str, output_flag: bool = False, intermediate_path: str = None, chunk_size: int = None):
-    ''' Validates the user passed source file against the user passed schema file. 
+    intermediate_file = open(intermediate_path, 'w', encoding = 'utf-8') if intermediate_path else None
+    try:
+        if intermediate_file:
+            intermediate_file.write('[')
+        first = True
+        for chunk in chunks:
+            # casting to object gives native Python values that the validator can type check
+            records = chunk.astype(object).where(chunk.notna(), None).to_dict(orient = 'records')
+            for record in records:
+                if intermediate_file:
+                    intermediate_file.write(('\n' if first else ',\n') + textwrap.indent(json.dumps(record, indent = 4), '    '))
+                first = False
+                yield record
+        if intermediate_file:
+            intermediate_file.write('\n]' if not first else ']')
+    finally:
+        if intermediate_file:
+            intermediate_file.close()
+
+def validate_data(source: str, source_type_json: bool, schema: str, output_flag: bool = False, intermediate_path: str = None, chunk_size: int = None, workers: int = 1, backend: str = 'jsonschema', cache_path: str = None, incremental: bool = False):
+    ''' Validates the user passed source file against the user passed schema file. The schema's item 
+    schema is compiled once and each record is validated independently, so every failing record is 
+    reported (with its index and biomarker_id) instead of stopping at the first error. JSON array 
+    and JSON Lines sources are streamed from disk one record at a time.
 
     Parameters
     ----------
@@ -143,26 +197,401 @@ def validate_data(source: str, source_type_json: bool, schema: str, output_flag:
         Filepath to store the intermediate JSON. 
     chunk_size: int
         Chunk size to process the source data with (optional, default None).
+    workers: int
+        Number of worker processes to validate the records with (optional, default 1).
+    backend: str
+        Validation backend, 'jsonschema' or 'fast' (optional, default 'jsonschema').
+    cache_path: str
+        Directory to cache the generated validation code and the incremental validation results in (optional, default None).
+    incremental: bool
+        Whether to reuse the stored results of unchanged records (optional, default False).
     '''
 
+    with open(schema, 'r') as f:
+        schema_data = json.load(f)
+
     # if input is not json than no need to convert first
     if not source_type_json:
-        data = convert_to_json(source, output_flag, intermediate_path, chunk_size)
-    elif source_type_json:
+        records = stream_tsv_records(source, chunk_size, intermediate_path if output_flag else None)
+    elif source.endswith('.jsonl'):
+        records = stream_jsonl_records(source)
+    elif is_json_array(source):
+        records = stream_json_records(source)
+    # a non array document can't be validated per record, validate the whole document instead
+    else:
         with open(source, 'r') as f:
-            data = json.load(f) 
+            data = json.load(f)
+        errors = list(compile_validator(schema_data).iter_errors(data))
+        if errors:
+            print(f'Validation error: check log file.')
+            logging.error('Validation error:\n' + '\n'.join(format_error(error) for error in errors))
+        else:
+            print(f'Validation successful.')
+            logging.info('Validation successful.')
+        return
+
+    item_schema = get_item_schema(schema_data)
+    # the generated code is cached before starting any workers so they only have to load it
+    fast_check = compile_fast_check(item_schema, cache_path) if backend == 'fast' else None
+    if workers > 1:
+        validate_fn = partial(validate_records_parallel, item_schema = item_schema, workers = workers, fast = fast_check is not None, cache_path = cache_path)
+    else:
+        validate_fn = partial(validate_records, validator = compile_validator(item_schema), fast_check = fast_check)
+
+    store = None
+    if incremental:
+        if not cache_path:
+            raise ValueError(f'Incremental validation requires the validation cache_path to be set in the config file.')
+        store = open_result_store(cache_path)
+        results = validate_records_incremental(records, validate_fn, store, hash_json(item_schema))
+    else:
+        results = validate_fn(records)
 
-    with open(schema, 'r') as f:
-        schema_data = json.load(f)
-    
+    record_count = 0
+    failed_count = 0
     try:
-        # attempt to validate the data
-        validate(instance = data, schema = schema_data)
+        for index, biomarker_id, messages in results:
+            record_count += 1
+            if messages:
+                failed_count += 1
+                logging.error(f'Validation error in record {index} (biomarker_id: {biomarker_id}):\n\t' + '\n\t'.join(messages))
+    finally:
+        if store is not None:
+            store.close()
+
+    if failed_count == 0:
         print(f'Validation successful.')
-        logging.info('Validation successful.')
-    except ValidationError as e:
-        print(f'Validation error: check log file.')
-        logging.error(f'Validation error:\n{e}')
+        logging.info(f'Validation successful. Validated {record_count} records.')
+    else:
+        print(f'Validation error: {failed_count} of {record_count} records failed validation, check log file.')
+        logging.error(f'Validation failed for {failed_count} of {record_count} records.')
+
+def compile_validator(schema_data: dict) -> Validator:
+    ''' Builds the validator for a schema, using the validator class for the schema's declared draft.
+
+    Parameters
+    ----------
+    schema_data: dict
+        The schema to build the validator for.
+
+    Returns
+    -------
+    Validator
+        The compiled validator.
+    '''
+    validator_class = validator_for(schema_data)
+    validator_class.check_schema(schema_data)
+    return validator_class(schema_data)
+
+def compile_fast_check(item_schema: dict, cache_path: str = None) -> Optional[Callable[[dict], bool]]:
+    ''' Generates specialized Python validation code for the record schema using fastjsonschema. The 
+    generated code is cached on disk keyed by the hash of the schema (and the generator version) so 
+    it is only generated once per schema version. If fastjsonschema is not installed, falls back to 
+    the jsonschema backend.
+
+    Parameters
+    ----------
+    item_schema: dict
+        The schema for a single record.
+    cache_path: str
+        Directory to cache the generated validation code in (optional, default None, no caching).
+
+    Returns
+    -------
+    Callable[[dict], bool] or None
+        Function returning whether a record passes the generated validator, or None if 
+        fastjsonschema is not available.
+    '''
+    try:
+        import fastjsonschema
+    except ImportError:
+        print(f'Warning: fastjsonschema is not installed, falling back to the jsonschema backend.')
+        logging.warning('fastjsonschema is not installed, falling back to the jsonschema backend.')
+        return None
+
+    # the generated function is named after the schema $id, drop it so the entry point is always `validate`
+    generator_schema = {key: value for key, value in item_schema.items() if key != '$id'}
+    schema_hash = hash_json({'generator_version': fastjsonschema.VERSION, 'schema': generator_schema})
+
+    code = None
+    cache_filepath = None
+    if cache_path:
+        os.makedirs(cache_path, exist_ok = True)
+        cache_filepath = os.path.join(cache_path, f'validator_{schema_hash}.py')
+        if os.path.isfile(cache_filepath):
+            with open(cache_filepath, 'r') as f:
+                code = f.read()
+            logging.info(f'Loaded cached validation code from {cache_filepath}.')
+    if code is None:
+        code = fastjsonschema.compile_to_code(generator_schema)
+        if cache_filepath:
+            # write to a temporary file first so concurrent runs never read a partial file
+            tmp_filepath = f'{cache_filepath}.{os.getpid()}.tmp'
+            with open(tmp_filepath, 'w') as f:
+                f.write(code)
+            os.replace(tmp_filepath, cache_filepath)
+            logging.info(f'Cached generated validation code to {cache_filepath}.')
+
+    namespace = {}
+    exec(compile(code, cache_filepath or '<generated validator>', 'exec'), namespace)
+    generated_validate = namespace['validate']
+
+    def fast_check(record: dict) -> bool:
+        try:
+            generated_validate(record)
+        except fastjsonschema.JsonSchemaException:
+            return False
+        return True
+
+    return fast_check
+
+def is_json_array(source: str) -> bool:
+    ''' Checks whether the top level value of a JSON file is an array without reading the full file.
+
+    Parameters
+    ----------
+    source: str
+        Filepath of the JSON file.
+
+    Returns
+    -------
+    bool
+        True if the top level value is an array, False otherwise.
+    '''
+    with open(source, 'r', encoding = 'utf-8') as f:
+        while char := f.read(1):
+            if not char.isspace() and char != '\ufeff':
+                return char == '['
+    return False
+
+def stream_json_records(source: str) -> Iterator[dict]:
+    ''' Lazily yields the records of a JSON array file one at a time.
+
+    Parameters
+    ----------
+    source: str
+        Filepath of the JSON file.
+
+    Returns
+    -------
+    Iterator[dict]
+        Iterator over the records.
+    '''
+    with open(source, 'rb') as f:
+        yield from ijson.items(f, 'item', use_float = True)
+
+def stream_jsonl_records(source: str) -> Iterator[dict]:
+    ''' Lazily yields the records of a JSON Lines file (one record per line), blank lines are skipped.
+
+    Parameters
+    ----------
+    source: str
+        Filepath of the JSON Lines file.
+
+    Returns
+    -------
+    Iterator[dict]
+        Iterator over the records.
+    '''
+    with open(source, 'r', encoding = 'utf-8') as f:
+        for line_number, line in enumerate(f, start = 1):
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                logging.error(f'Invalid JSON on line {line_number} of {source}: {e}')
+                raise ValueError(f'Invalid JSON on line {line_number} of {source}: {e}')
+
+def validate_records(records: Iterable[dict], validator: Validator, fast_check: Callable[[dict], bool] = None) -> Iterator[tuple]:
+    ''' Validates each record independently. If a fast check is passed, records are first checked 
+    with it and only the records it rejects are validated with the full validator, which stays the 
+    reference for the reported errors.
+
+    Parameters
+    ----------
+    records: Iterable[dict]
+        The records to validate.
+    validator: Validator
+        The compiled record validator.
+    fast_check: Callable[[dict], bool]
+        Generated validation function (optional, default None).
+
+    Returns
+    -------
+    Iterator[tuple]
+        Tuples of (index, biomarker_id, error messages) for each record, the error messages 
+        list is empty for valid records.
+    '''
+    for index, record in enumerate(records):
+        biomarker_id = record.get('biomarker_id') if isinstance(record, dict) else None
+        if fast_check is not None and fast_check(record):
+            yield index, biomarker_id, []
+        else:
+            yield index, biomarker_id, [format_error(error) for error in validator.iter_errors(record)]
+
+def validate_records_incremental(records: Iterable[dict], validate_fn: Callable[[Iterable[dict]], Iterator[tuple]], store: sqlite3.Connection, schema_hash: str) -> Iterator[tuple]:
+    ''' Validates only the records without a stored result for the current schema, reusing the 
+    stored results for the rest. Records are looked up by the hash of their canonical JSON, and the 
+    results of the newly validated records are added to the store.
+
+    Parameters
+    ----------
+    records: Iterable[dict]
+        The records to validate.
+    validate_fn: Callable[[Iterable[dict]], Iterator[tuple]]
+        Function validating an iterable of records (see `validate_records`).
+    store: sqlite3.Connection
+        The result store (see `open_result_store`).
+    schema_hash: str
+        Hash of the record schema.
+
+    Returns
+    -------
+    Iterator[tuple]
+        Tuples of (index, biomarker_id, error messages) for each record in the source order, the 
+        error messages list is empty for valid records.
+    '''
+    def lookup(index: int, record: dict) -> tuple:
+        biomarker_id = record.get('biomarker_id') if isinstance(record, dict) else None
+        record_hash = hash_json(record)
+        row = store.execute('SELECT errors FROM results WHERE schema_hash = ? AND record_hash = ?', (schema_hash, record_hash)).fetchone()
+        return index, biomarker_id, json.loads(row[0]) if row is not None else None, record_hash, record
+
+    entries = (lookup(index, record) for index, record in enumerate(records))
+    # records handed to the validator and read ahead of it, in the source order, with the stored 
+    # messages or None if the record is waiting on its result
+    order = deque()
+    # record to validate found by the main loop, handed over to the validator
+    handoff = deque()
+
+    def new_records() -> Iterator[dict]:
+        while True:
+            while handoff:
+                yield handoff.popleft()
+            # the validator reads ahead (e.g. to fill a worker batch), stored results read along the 
+            # way are queued behind the records waiting on theirs
+            entry = next(entries, None)
+            if entry is None:
+                return
+            order.append(entry[:4])
+            if entry[2] is None:
+                yield entry[4]
+
+    results = None
+    hit_count = 0
+    new_count = 0
+    for entry in entries:
+        # nothing is waiting on a result, so stored results are yielded straight away
+        if entry[2] is not None:
+            hit_count += 1
+            yield entry[:3]
+            continue
+        order.append(entry[:4])
+        handoff.append(entry[4])
+        if results is None:
+            results = validate_fn(new_records())
+        while order:
+            _, _, messages = next(results)
+            index, biomarker_id, _, record_hash = order.popleft()
+            store.execute('INSERT OR REPLACE INTO results VALUES (?, ?, ?)', (schema_hash, record_hash, json.dumps(messages)))
+            new_count += 1
+            if new_count % RESULT_STORE_COMMIT_SIZE == 0:
+                store.commit()
+            yield index, biomarker_id, messages
+            while order and order[0][2] is not None:
+                hit_count += 1
+                yield order.popleft()[:3]
+    if results is not None:
+        # lets the validator finish (e.g. shut its worker pool down)
+        for _ in results:
+            pass
+    store.commit()
+
+    logging.info(f'Incremental validation: reused {hit_count} stored results, validated {new_count} new or changed records.')
+
+def open_result_store(cache_path: str) -> sqlite3.Connection:
+    ''' Opens (creating it if needed) the store of validation results keyed by schema hash and record hash.
+
+    Parameters
+    ----------
+    cache_path: str
+        Directory to keep the result store in.
+
+    Returns
+    -------
+    sqlite3.Connection
+        Connection to the result store.
+    '''
+    os.makedirs(cache_path, exist_ok = True)
+    store = sqlite3.connect(os.path.join(cache_path, RESULT_STORE_FILENAME))
+    store.execute('CREATE TABLE IF NOT EXISTS results (schema_hash TEXT NOT NULL, record_hash TEXT NOT NULL, errors TEXT NOT NULL, PRIMARY KEY (schema_hash, record_hash))')
+    return store
+
+def hash_json(value) -> str:
+    ''' Hashes the canonical JSON serialization (sorted keys, no whitespace) of a value.
+
+    Parameters
+    ----------
+    value
+        The JSON serializable value to hash.
+
+    Returns
+    -------
+    str
+        The sha256 hex digest.
+    '''
+    canonical = json.dumps(value, sort_keys = True, separators = (',', ':'), ensure_ascii = False)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+def validate_records_parallel(records: Iterable[dict], item_schema: dict, workers: int, fast: bool = False, cache_path: str = None) -> Iterator[tuple]:
+    ''' Validates batches of records across a pool of worker processes, each holding its own 
+    compiled validator. At most two batches per worker are in flight at a time so memory usage 
+    stays bounded, and the results are yielded back in the source order.
+
+    Parameters
+    ----------
+    records: Iterable[dict]
+        The records to validate.
+    item_schema: dict
+        The schema for a single record.
+    workers: int
+        Number of worker processes.
+    fast: bool
+        Whether to use the generated validation code (optional, default False).
+    cache_path: str
+        Directory the generated validation code is cached in (optional, default None).
+
+    Returns
+    -------
+    Iterator[tuple]
+        Tuples of (index, biomarker_id, error messages) for each record, the error messages 
+        list is empty for valid records.
+    '''
+    max_pending = workers * 2
+    with Pool(workers, initializer = _init_worker, initargs = (item_schema, fast, cache_path)) as pool:
+        pending = deque()
+        records = enumerate(records)
+        while batch := list(islice(records, WORKER_BATCH_SIZE)):
+            pending.append(pool.apply_async(_validate_batch, (batch,)))
+            if len(pending) >= max_pending:
+                yield from pending.popleft().get()
+        while pending:
+            yield from pending.popleft().get()
+
+def _init_worker(item_schema: dict, fast: bool, cache_path: str) -> None:
+    ''' Compiles the record validator (and the fast check) in the worker process.
+    '''
+    global _worker_validator, _worker_fast_check
+    _worker_validator = compile_validator(item_schema)
+    _worker_fast_check = compile_fast_check(item_schema, cache_path) if fast else None
+
+def _validate_batch(batch: list) -> list:
+    ''' Validates a batch of (index, record) pairs in a worker process.
+    '''
+    offset = batch[0][0]
+    records = [record for _, record in batch]
+    return [(offset + index, biomarker_id, messages) for index, biomarker_id, messages in validate_records(records, _worker_validator, _worker_fast_check)]
 
 def validate_filepath(filepath: str, mode: str) -> None:
     ''' Validates the filepaths for the user inputted source path and
@@ -185,6 +614,58 @@ def validate_filepath(filepath: str, mode: str) -> None:
     else:
         raise ValueError(f'Validate_filepath error: Invalid mode {mode}')
 
+@contextlib.contextmanager
+def profile_run(profile_prefix: str, enabled: bool = True, memory: bool = False, top: int = PROFILE_TOP_N) -> Iterator[None]:
+    ''' Profiles the code run inside the context with cProfile (and optionally tracemalloc). The raw 
+    stats are written to `<profile_prefix>_profile.pstats` and a summary of the top functions by 
+    cumulative and internal time (and the peak memory and top allocation sites) to 
+    `<profile_prefix>_profile.txt`. The worker processes of a parallel run are not profiled.
+
+    Parameters
+    ----------
+    profile_prefix: str
+        Filepath prefix of the profile files.
+    enabled: bool (default True)
+        Whether to profile, if False the context does nothing.
+    memory: bool (default False)
+        Whether to also trace the memory allocations with tracemalloc.
+    top: int (default PROFILE_TOP_N)
+        Number of functions and allocation sites listed in the summary.
+    '''
+    if not enabled:
+        yield
+        return
+    import cProfile
+    import pstats
+    import tracemalloc
+    if memory:
+        tracemalloc.start()
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        snapshot, peak = None, None
+        if memory:
+            snapshot = tracemalloc.take_snapshot()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        stats_filepath = f'{profile_prefix}_profile.pstats'
+        summary_filepath = f'{profile_prefix}_profile.txt'
+        profiler.dump_stats(stats_filepath)
+        with open(summary_filepath, 'w') as f:
+            stats = pstats.Stats(stats_filepath, stream = f)
+            for sort_key in ('cumulative', 'tottime'):
+                f.write(f'Top {top} functions by {sort_key} time:\n')
+                stats.sort_stats(sort_key).print_stats(top)
+            if memory:
+                f.write(f'Peak traced memory: {peak / 1_000_000:.1f} MB\n\nTop {top} allocation sites at the end of the run:\n')
+                for stat in snapshot.statistics('lineno')[:top]:
+                    f.write(f'{stat}\n')
+        logging.info(f'Profile written to {stats_filepath} and {summary_filepath}.')
+        print(f'Profile written to {stats_filepath} and {summary_filepath}.')
+
 def setup_logging(log_path: str) -> None:
     ''' Configures the logger to write to a file.
 
@@ -206,6 +687,7 @@ def main() -> None:
         _version = config['version']
         log_path = config[_VAL_KEY]['log_path']
         intermediate_path = config[_VAL_KEY]['intermediate_path']
+        cache_path = config[_VAL_KEY].get('cache_path')
     
     # make sure directory to dump logs in exists 
     validate_filepath(os.path.split(log_path)[0], 'output')
@@ -215,7 +697,7 @@ def main() -> None:
     logging.info('################################## Start ##################################')
 
     # parse the user arguments 
-    user_args(intermediate_path)
+    user_args(intermediate_path, cache_path, log_path)
     
     # log the end delimiter for the run 
     logging.info('################################## End ##################################\n')
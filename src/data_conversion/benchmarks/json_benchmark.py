@@ -0,0 +1,101 @@
+''' JSON serialization benchmark. Measures the load, indented dump and compact dump times of each
+available JSON backend (see misc_functions.JSON_BACKENDS) on the mapping data caches and, optionally,
+a full data release.
+
+Usage: python benchmarks/json_benchmark.py [options] [filepaths ...]
+
+    Positional arguments:
+        filepaths           JSON files to benchmark (default the ChEBI mapping data shards)
+
+    Optional arguments:
+        -n --runs           number of runs per file and backend, the best run is reported (default 3)
+        -h --help           show the help message and exit
+
+Run from the `src/data_conversion/` directory.
+'''
+
+import argparse
+import glob
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from fmt_lib import misc_functions as misc_fns
+
+DEFAULT_FILEPATHS = os.path.join('..', '..', 'mapping_data', 'chebi_map', '*.json')
+
+def best_time(fn, runs: int) -> float:
+    ''' Times a function over multiple runs.
+
+    Parameters
+    ----------
+    fn: Callable
+        The function to time.
+    runs: int
+        Number of runs.
+
+    Returns
+    -------
+    float
+        The best wall clock time in milliseconds.
+    '''
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1_000)
+    return min(timings)
+
+def available_backends() -> list:
+    ''' Gets the JSON backends that are installed.
+
+    Returns
+    -------
+    list
+        The installed backends.
+    '''
+    backends = []
+    for backend in misc_fns.JSON_BACKENDS:
+        try:
+            misc_fns.set_json_backend(backend)
+        except ValueError:
+            continue
+        backends.append(backend)
+    return backends
+
+def main() -> None:
+
+    parser = argparse.ArgumentParser(
+        prog = 'data conversion JSON benchmark',
+        usage = 'python benchmarks/json_benchmark.py [options] [filepaths ...]'
+    )
+    parser.add_argument('filepaths', nargs = '*', help = 'JSON files to benchmark (default the ChEBI mapping data shards)')
+    parser.add_argument('-n', '--runs', type = int, default = 3, help = 'number of runs per file and backend (default 3)')
+    options = parser.parse_args()
+
+    filepaths = options.filepaths or sorted(glob.glob(DEFAULT_FILEPATHS))
+    if not filepaths:
+        print(f'No JSON files found matching {DEFAULT_FILEPATHS}.')
+        sys.exit(1)
+    backends = available_backends()
+    target_filepath = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'json_benchmark_output.json')
+
+    print(f'{"file":<28}{"size (MB)":>10}  {"backend":<8}{"load (ms)":>11}{"dump (ms)":>11}{"compact dump (ms)":>19}{"compact size (MB)":>19}')
+    try:
+        for filepath in filepaths:
+            size = os.path.getsize(filepath) / 1_000_000
+            for backend in backends:
+                misc_fns.set_json_backend(backend)
+                data = misc_fns.load_json(filepath)
+                load_time = best_time(lambda: misc_fns.load_json(filepath), options.runs)
+                dump_time = best_time(lambda: misc_fns.write_json(target_filepath, data), options.runs)
+                compact_time = best_time(lambda: misc_fns.write_json(target_filepath, data, compact = True), options.runs)
+                compact_size = os.path.getsize(target_filepath) / 1_000_000
+                print(f'{os.path.basename(filepath):<28}{size:>10.1f}  {backend:<8}{load_time:>11.1f}{dump_time:>11.1f}{compact_time:>19.1f}{compact_size:>19.1f}')
+    finally:
+        if os.path.isfile(target_filepath):
+            os.remove(target_filepath)
+
+if __name__ == '__main__':
+    main()
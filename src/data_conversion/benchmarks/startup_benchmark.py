@@ -0,0 +1,91 @@
+''' Startup time benchmark for the data conversion CLI. Measures the wall clock time of spawning
+the CLI and of loading the modules each conversion type needs, and reports which heavy modules
+(network clients, XML parsing, schema validation) each conversion type loads.
+
+Usage: python benchmarks/startup_benchmark.py [options]
+
+    Optional arguments:
+        -n --runs           number of runs per scenario (default 20)
+        -h --help           show the help message and exit
+
+Run from the `src/data_conversion/` directory.
+'''
+
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+# heavy modules that should only be loaded by the conversions that need them
+HEAVY_MODULES = ('requests', 'pymed', 'dotenv', 'xml.etree.ElementTree', 'jsonschema')
+# scenario name -> code run in a fresh interpreter
+SCENARIOS = {
+    'cli --version': None,
+    'JSON -> NT/TTL': 'import data_conversion; from fmt_lib import json_to_nt',
+    'JSON -> TSV': 'import data_conversion; from fmt_lib import json_to_tsv',
+    'TSV -> JSON': 'import data_conversion; from fmt_lib import tsv_to_json',
+    'TSV -> JSON --validate': 'import data_conversion; from fmt_lib import tsv_to_json, schema_validation',
+}
+
+def time_command(command: list, runs: int) -> list:
+    ''' Times a command over multiple runs.
+
+    Parameters
+    ----------
+    command: list
+        The command to run.
+    runs: int
+        Number of runs.
+
+    Returns
+    -------
+    list
+        The wall clock time of each run in milliseconds.
+    '''
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(command, check = True, capture_output = True)
+        timings.append((time.perf_counter() - start) * 1_000)
+    return timings
+
+def loaded_heavy_modules(code: str) -> list:
+    ''' Gets the heavy modules loaded after running the code in a fresh interpreter.
+
+    Parameters
+    ----------
+    code: str
+        The code to run.
+
+    Returns
+    -------
+    list
+        The loaded heavy modules.
+    '''
+    check = f'{code}; import sys; print(",".join(m for m in {HEAVY_MODULES!r} if m in sys.modules))'
+    result = subprocess.run([sys.executable, '-c', check], check = True, capture_output = True, text = True)
+    return [module for module in result.stdout.strip().split(',') if module]
+
+def main() -> None:
+
+    parser = argparse.ArgumentParser(
+        prog = 'data conversion startup benchmark',
+        usage = 'python benchmarks/startup_benchmark.py [options]'
+    )
+    parser.add_argument('-n', '--runs', type = int, default = 20, help = 'number of runs per scenario (default 20)')
+    options = parser.parse_args()
+
+    print(f'{"scenario":<26}{"min (ms)":>10}{"median (ms)":>13}  heavy modules loaded')
+    for name, code in SCENARIOS.items():
+        if code is None:
+            command = [sys.executable, 'data_conversion.py', '--version']
+            heavy = loaded_heavy_modules('import data_conversion')
+        else:
+            command = [sys.executable, '-c', code]
+            heavy = loaded_heavy_modules(code)
+        timings = time_command(command, options.runs)
+        print(f'{name:<26}{min(timings):>10.1f}{statistics.median(timings):>13.1f}  {", ".join(heavy) if heavy else "-"}')
+
+if __name__ == '__main__':
+    main()
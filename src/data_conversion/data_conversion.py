@@ -1,6 +1,6 @@
 ''' Biomarker-Partnership data converter. This script is the entry point for the data conversion
 logic. Can convert table formatted data to the data model JSON, JSON data to the table format, and
-JSON data to N-Triples.
+JSON data to N-Triples (or Turtle).
 
 Script is not agnostic to the formatting of the current table format/structure or the current data
 model JSON schema. If those are updated in the future, this script needs to be updated. 
@@ -9,21 +9,54 @@ Currently written for the v0.3.2 data model schema and supports the following co
     - JSON -> TSV
     - TSV -> JSON
     - JSON -> NT
+    - JSON -> TTL
+    - TSV -> NT
+    - TSV -> TTL
 
 Usage: data_conversion.py [options]
 
     If the source file passed is of type JSON, then it will assume the conversion is JSON -> TSV 
     and the target_filepath should be of type .tsv. If the source file passed is of type TSV, then 
     it will assume the conversion is TSV -> JSON and the target_filepath should be of type .json. 
+    A JSON source can also be converted to RDF by passing a target_filepath of type .nt (N-Triples) 
+    or .ttl (Turtle). Any of the source and target files can be gzip (.gz) or zstandard (.zst) 
+    compressed (e.g. .json.gz or .nt.zst), they are (de)compressed on the fly. The JSON data model 
+    can also be read and written as JSON Lines (.jsonl, one biomarker entry per line) in place of 
+    a .json file. A TSV source can be converted to RDF directly, the built entries are passed straight 
+    to the triple builders without writing and re-reading the JSON (pass --json to also write it).
+
+    If the source_filepath is a directory or a glob pattern, all the JSON/TSV files it contains 
+    (or matches) are converted into the target_filepath directory (batch conversion). 
+
+    A source_filepath of - reads the source from stdin and a target_filepath of - writes the target 
+    to stdout, so conversions can be chained in a pipeline without intermediate files. The format of 
+    stdin/stdout has to be given with --from/--to, e.g.:
+        zcat biomarkers.tsv.gz | python data_conversion.py - - --from tsv --to jsonl | gzip > biomarkers.jsonl.gz
 
     Positional arguments:
-        source_filepath     filepath of the source file (accepts JSON or TSV)
-        target_filepath     filepath of the target file (accepts JSON or TSV)
+        source_filepath     filepath of the source file (accepts JSON or TSV), a directory or glob pattern, or - for stdin
+        target_filepath     filepath of the target file (accepts JSON or TSV), the output directory, or - for stdout
     
     Optional arguments: 
         -c --chunk          log/write checkpoint (if not provided, will default to 10,000)
         -l --log            whether to print a message indicating the progress (default False)
         -m --metadata       whether to attempt automatic metadata retrieval for TSV to JSON converstions (default True)
+        -w --workers        number of worker processes for JSON/TSV to NT/TTL conversions, or files converted in parallel for batch conversions (default 1)
+        -d --dedup          whether to remove duplicate triples across the whole dataset for JSON/TSV to NT/TTL conversions (default False)
+        -e --extension      target file extension for batch conversions (default .tsv for JSON sources and .json for TSV sources)
+        --validate          whether to validate each entry against the item schema for TSV to JSON conversions (default False)
+        --compact           whether to write compact (unindented) JSON for TSV to JSON conversions (default False)
+        --from              format of the source (json, jsonl, or tsv), required when reading from stdin
+        --to                format of the target (json, jsonl, tsv, nt, or ttl), required when writing to stdout
+        --json              for TSV to NT/TTL conversions, also write the JSON data model to this filepath
+        --previous          for TSV to JSON conversions, the previous JSON output to rebuild incrementally against
+        --row-hashes        for TSV to JSON conversions, write the row hashes the next --previous rebuild needs next to the JSON output (default False)
+        --checkpoint        for TSV conversions, write a checkpoint every chunk rows so an interrupted conversion can be resumed (default False)
+        --resume            for TSV conversions, resume from the checkpoint left by an interrupted conversion, implies --checkpoint (default False)
+        --profile           profile the run with cProfile, the stats and a summary are written next to the log file (default False)
+        --profile-memory    with --profile, also trace the memory allocations with tracemalloc (default False)
+        --metrics           write the per-stage timing and throughput metrics of the conversion (per file for batch conversions) to this JSON filepath (default None)
+        --prometheus        write the metrics of the conversion (including the metadata cache and API latency metrics) to this Prometheus textfile (default None)
         -h --help           show the help message and exit 
         -v --version        show current version number and exit 
 '''
@@ -33,92 +66,256 @@ import argparse
 import os
 import sys
 import time
+import glob
+from multiprocessing import Pool
+from functools import partial
 from fmt_lib import misc_functions as misc_fns
-from fmt_lib import json_to_tsv as j_to_t
-from fmt_lib import tsv_to_json as t_to_j
-from fmt_lib import json_to_nt as j_to_nt
+from fmt_lib import metrics
+from fmt_lib import profiling
+from fmt_lib.converter import Converter, get_conversion_error, SOURCE_EXTENSIONS, SOURCE_FORMATS, TARGET_FORMATS
 
-_CONF_KEY = 'data_conversion'
 _version = None
-TSV_HEADERS = ['biomarker_id', 'biomarker', 'assessed_biomarker_entity', 'assessed_biomarker_entity_id', 
-            'assessed_entity_type', 'condition', 'condition_id', 'exposure_agent', 'exposure_agent_id', 
-            'best_biomarker_role', 'specimen', 'specimen_id', 'loinc_code', 'evidence_source', 'evidence',
-            'tag']
+# default target extension per source extension for batch conversions
+BATCH_DEFAULT_EXTENSIONS = {'.json': '.tsv', '.jsonl': '.tsv', '.tsv': '.json'}
+# converter of a batch worker process
+_batch_converter = None
 
-def user_args(url_map: dict, triples_map: dict, namespace_map: dict) -> None:
+def user_args(converter: Converter) -> None:
     ''' Parse user inputted arguments and call the appropriate function to convert the data.
 
     Parameters
     ----------
-    url_map: dict
-        Map for URL building.
-    triples_map: dict 
-        Map to build RDF triples.
-    namespace_map: dict
-        Map for resource namespaces.
+    converter: Converter
+        Converter holding the loaded maps.
     '''
     parser = argparse.ArgumentParser(
         prog = 'biomarker-partnership data conversion',
         usage = 'python data_conversion.py [options] source_filepath target_filepath'
     )
-    parser.add_argument('source_filepath', help = 'filepath of the source file')
-    parser.add_argument('target_filepath', help = 'filepath of the target file to generate')
+    parser.add_argument('source_filepath', help = 'filepath of the source file, a directory or glob pattern of source files for batch conversions, or - to read from stdin')
+    parser.add_argument('target_filepath', help = 'filepath of the target file to generate, the output directory for batch conversions, or - to write to stdout')
     parser.add_argument('-c', '--chunk', type = int, default = 10_000, help = 'write checkpoint (default will dump to disk every 10,000 records/rows)')
     parser.add_argument('-l', '--log', action = 'store_true', help = 'whether to print a message indicating the write checkpoin has been hit (default False)')
     parser.add_argument('-m', '--metadata', action = 'store_false', help = 'whether to attempt automatic metadata retrieval for TSV to JSON converstions (default True)')
+    parser.add_argument('-w', '--workers', type = int, default = 1, help = 'number of worker processes for JSON/TSV to NT/TTL conversions, or the number of files converted in parallel for batch conversions (default 1)')
+    parser.add_argument('-d', '--dedup', action = 'store_true', help = 'whether to remove duplicate triples across the whole dataset for JSON/TSV to NT/TTL conversions, output will be sorted (default False)')
+    parser.add_argument('--validate', action = 'store_true', help = 'whether to validate each entry against the item schema for TSV to JSON conversions, failures are written to a report next to the target file (default False)')
+    parser.add_argument('--compact', action = 'store_true', help = 'whether to write compact (unindented) JSON for TSV to JSON conversions, much faster to write and smaller for large outputs (default False)')
+    parser.add_argument('--from', dest = 'source_format', choices = SOURCE_FORMATS, default = None, help = 'format of the source, required when reading from stdin (default determined by the source file extension)')
+    parser.add_argument('--to', dest = 'target_format', choices = TARGET_FORMATS, default = None, help = 'format of the target, required when writing to stdout (default determined by the target file extension)')
+    parser.add_argument('--json', dest = 'json_filepath', default = None, help = 'for TSV to NT/TTL conversions, also write the JSON data model to this filepath (default None)')
+    parser.add_argument('--previous', dest = 'previous_filepath', default = None, help = 'for TSV to JSON conversions, the previous JSON output to rebuild incrementally against, only the entries whose TSV rows changed are rebuilt (default None)')
+    parser.add_argument('--row-hashes', action = 'store_true', help = 'for TSV to JSON conversions (and TSV to NT/TTL conversions with --json), write the row hashes next to the JSON output so it can be the --previous output of the next incremental rebuild, always done with --previous (default False)')
+    parser.add_argument('--checkpoint', action = 'store_true', help = 'for TSV conversions, write a checkpoint next to the target file every chunk rows so an interrupted conversion can be resumed with --resume (default False)')
+    parser.add_argument('--resume', action = 'store_true', help = 'for TSV conversions, resume from the checkpoint left next to the target file by an interrupted conversion, implies --checkpoint (default False)')
+    parser.add_argument('--metrics', dest = 'metrics_filepath', default = None, help = 'write the per-stage timing and throughput metrics of the conversion (per file for batch conversions) to this JSON filepath, they are always logged (default None)')
+    parser.add_argument('--prometheus', dest = 'prometheus_filepath', default = None, help = 'write the metrics of the conversion, including the per-resource metadata cache hits/misses and API latency histograms, to this Prometheus textfile, labelled per file for batch conversions (default None)')
+    parser.add_argument('--profile', action = 'store_true', help = 'profile the run with cProfile, the sorted stats (.pstats) and a summary of the top functions (.txt) are written next to the log file (default False)')
+    parser.add_argument('--profile-memory', action = 'store_true', help = 'with --profile, also trace the memory allocations with tracemalloc and add the peak memory and the top allocation sites to the summary (default False)')
+    parser.add_argument('-e', '--extension', type = str, default = None, help = 'target file extension for batch conversions, e.g. .nt or .ttl.gz (default .tsv for JSON sources and .json for TSV sources)')
     parser.add_argument('-v', '--version', action = 'version', version = f'%(prog)s {_version}')
     if len(sys.argv) <= 2:
         sys.argv.append('-h')
     options = parser.parse_args()
-    misc_fns.validate_filepath(options.source_filepath, 'input')
-    misc_fns.validate_filepath(os.path.split(options.target_filepath)[0], 'output')
+
+    batch = os.path.isdir(options.source_filepath) or glob.has_magic(options.source_filepath)
+    if batch:
+        # the extra JSON output and the previous output are single files, which can't be shared across the batch
+        for option, value in (('--json', options.json_filepath), ('--previous', options.previous_filepath)):
+            if value is not None:
+                parser.error(f'{option} is not supported for batch conversions (directory or glob pattern source).')
+        misc_fns.validate_filepath(options.target_filepath, 'output')
+    else:
+        if options.source_filepath != misc_fns.STDIO_PATH:
+            misc_fns.validate_filepath(options.source_filepath, 'input')
+        if options.target_filepath != misc_fns.STDIO_PATH:
+            misc_fns.validate_filepath(os.path.split(options.target_filepath)[0], 'output')
 
     logging.info(
         f'Arguments passed:\n\tsource_filepath = {options.source_filepath}\
             \n\ttarget_filepath = {options.target_filepath}\
             \n\tchunk = {options.chunk}\
             \n\tlog = {options.log}\
-            \n\tmetadata = {options.metadata}'
+            \n\tmetadata = {options.metadata}\
+            \n\tworkers = {options.workers}\
+            \n\tdedup = {options.dedup}\
+            \n\tvalidate = {options.validate}\
+            \n\tcompact = {options.compact}\
+            \n\tsource_format = {options.source_format}\
+            \n\ttarget_format = {options.target_format}\
+            \n\tjson_filepath = {options.json_filepath}\
+            \n\tprevious_filepath = {options.previous_filepath}\
+            \n\trow_hashes = {options.row_hashes}\
+            \n\tcheckpoint = {options.checkpoint}\
+            \n\tresume = {options.resume}\
+            \n\tmetrics_filepath = {options.metrics_filepath}\
+            \n\tprometheus_filepath = {options.prometheus_filepath}\
+            \n\tprofile = {options.profile}\
+            \n\tprofile_memory = {options.profile_memory}\
+            \n\textension = {options.extension}'
     )
 
-    ### check that the source and target file types passed indicate a supported conversion type and pass 
-    ### to the appropriate function for processing 
+    profile_prefix = os.path.splitext(converter.log_path)[0]
+    with profiling.profile_run(profile_prefix, options.profile, options.profile_memory):
+        if batch:
+            failed = convert_batch(converter, options)
+            if failed:
+                sys.exit(1)
+            return
 
-    if options.source_filepath.endswith('.json'):
-        if not (options.target_filepath.endswith('.tsv')) and not (options.target_filepath.endswith('.nt')):
-            misc_fns.print_and_log('Error: Incorrect target_filepath file type for source type of JSON, expects TSV or NT.', 'error')
-            print('Error: Incorrect target_filepath file type for source type of JSON, expects TSV or NT.')
-            sys.exit(1)
-        if options.target_filepath.endswith('.tsv'):
-            j_to_t.json_to_tsv(options.source_filepath, options.target_filepath, TSV_HEADERS, options.chunk, options.log)
-        elif options.target_filepath.endswith('.nt'):
-            j_to_nt.json_to_nt(options.source_filepath, options.target_filepath, triples_map, namespace_map)
-    elif options.source_filepath.endswith('.tsv'):
-        if not (options.target_filepath.endswith('.json')):
-            misc_fns.print_and_log('Error: Incorrect target_filepath file type for source type of TSV, expects JSON.', 'error')
-            print('Error: Incorrect target_filepath file type for source type of TSV, expects JSON.')  
+        ### check that the source and target file types passed indicate a supported conversion type and pass 
+        ### to the converter for processing 
+        error = get_conversion_error(options.source_filepath, options.target_filepath, options.source_format, options.target_format)
+        if error:
+            misc_fns.print_and_log(error, 'error')
+            print(error, file = sys.stderr)
             sys.exit(1)
-        t_to_j.tsv_to_json(options.source_filepath, options.target_filepath, TSV_HEADERS, url_map, namespace_map, options.chunk, options.log, options.metadata)
-        
+        converter.convert(options.source_filepath, options.target_filepath, source_format = options.source_format,
+                          target_format = options.target_format, json_filepath = options.json_filepath,
+                          previous_filepath = options.previous_filepath, metrics_filepath = options.metrics_filepath,
+                          prometheus_filepath = options.prometheus_filepath,
+                          **conversion_kwargs(options))
+
+def conversion_kwargs(options: argparse.Namespace) -> dict:
+    ''' Gets the Converter.convert keyword arguments from the parsed user arguments.
+
+    Parameters
+    ----------
+    options: argparse.Namespace
+        The parsed user arguments.
+
+    Returns
+    -------
+    dict
+        The conversion keyword arguments.
+    '''
+    return {
+        'chunk': options.chunk,
+        'log': options.log,
+        'metadata': options.metadata,
+        'workers': options.workers,
+        'dedup': options.dedup,
+        'validate': options.validate,
+        'compact': options.compact,
+        'row_hashes': options.row_hashes,
+        'checkpoint': options.checkpoint,
+        'resume': options.resume
+    }
+
+def convert_batch(converter: Converter, options: argparse.Namespace) -> int:
+    ''' Converts all the source files in a directory (or matching a glob pattern) into the output 
+    directory. The files are converted across a pool of worker processes that share the loaded 
+    maps and validator, and a summary of the per-file timings is printed and logged.
+
+    Parameters
+    ----------
+    converter: Converter
+        Converter holding the loaded maps.
+    options: argparse.Namespace
+        The parsed user arguments.
+
+    Returns
+    -------
+    int
+        The number of files that failed to convert.
+    '''
+    if os.path.isdir(options.source_filepath):
+        source_filepaths = sorted(os.path.join(options.source_filepath, filename) for filename in os.listdir(options.source_filepath))
+    else:
+        source_filepaths = sorted(glob.glob(options.source_filepath))
+    source_filepaths = [filepath for filepath in source_filepaths if os.path.isfile(filepath) and misc_fns.strip_compression_extension(filepath).endswith(SOURCE_EXTENSIONS)]
+    if not source_filepaths:
+        misc_fns.print_and_log(f'No JSON or TSV source files found for {options.source_filepath}.', 'warning')
+        return 0
+
+    tasks = []
+    # target filepath -> source filepath, sources that share a stem (e.g. foo.json and foo.jsonl.gz) would overwrite each other
+    target_sources = {}
+    for source_filepath in source_filepaths:
+        filename = misc_fns.strip_compression_extension(os.path.basename(source_filepath))
+        stem, source_extension = os.path.splitext(filename)
+        extension = options.extension or BATCH_DEFAULT_EXTENSIONS[source_extension]
+        target_filepath = os.path.join(options.target_filepath, f'{stem}{extension}')
+        error = get_conversion_error(source_filepath, target_filepath)
+        if not error and target_filepath in target_sources:
+            error = f'Error: Source files {target_sources[target_filepath]} and {source_filepath} would both be converted to {target_filepath}, rename or move one of them.'
+        if error:
+            misc_fns.print_and_log(error, 'error')
+            print(error)
+            return len(source_filepaths)
+        target_sources[target_filepath] = source_filepath
+        tasks.append((source_filepath, target_filepath))
+
+    # the files are the unit of parallelism, each file is converted by a single process
+    kwargs = conversion_kwargs(options)
+    kwargs['workers'] = 1
+    misc_fns.print_and_log(f'Converting {len(tasks)} files with {options.workers} worker(s)...', 'info')
+    start_time = time.time()
+    if options.workers > 1:
+        with Pool(options.workers, initializer = _init_batch_worker, initargs = (converter,)) as pool:
+            results = list(pool.imap_unordered(partial(_convert_batch_file, kwargs = kwargs), tasks))
+    else:
+        _init_batch_worker(converter)
+        results = [_convert_batch_file(task, kwargs) for task in tasks]
+    elapsed_time = time.time() - start_time
+
+    if options.metrics_filepath:
+        misc_fns.write_json(options.metrics_filepath, {result[0]: result[4] for result in results})
+    if options.prometheus_filepath:
+        metrics.write_prometheus(options.prometheus_filepath, [({'source': result[0]}, result[4]) for result in results if result[4] is not None])
+
+    failed = [result for result in results if result[3] is not None]
+    summary = f'Batch conversion summary ({len(results) - len(failed)} converted, {len(failed)} failed, {elapsed_time:.2f} seconds):'
+    for source_filepath, target_filepath, seconds, error, _ in sorted(results, key = lambda result: result[2], reverse = True):
+        status = f'FAILED ({error})' if error else target_filepath
+        summary += f'\n\t{seconds:>9.2f}s  {source_filepath} -> {status}'
+    misc_fns.print_and_log(summary, 'info')
+    print(summary)
+    return len(failed)
+
+def _init_batch_worker(converter: Converter) -> None:
+    ''' Stores the converter (and its loaded maps) in the batch worker process.
+    '''
+    global _batch_converter
+    _batch_converter = converter
+
+def _convert_batch_file(task: tuple, kwargs: dict) -> tuple:
+    ''' Converts a single file of a batch conversion in the worker process.
+
+    Returns
+    -------
+    tuple
+        The source filepath, target filepath, elapsed seconds, the error message (None if the conversion succeeded)
+        and the conversion metrics (None if it failed).
+    '''
+    source_filepath, target_filepath = task
+    start_time = time.time()
+    error = None
+    conversion_metrics = None
+    try:
+        _batch_converter.convert(source_filepath, target_filepath, **kwargs)
+        conversion_metrics = _batch_converter.last_metrics
+    except Exception as e:
+        error = f'{type(e).__name__}: {e}'
+        misc_fns.print_and_log(f'Error converting {source_filepath}:\n\t{error}', 'error')
+    return source_filepath, target_filepath, time.time() - start_time, error, conversion_metrics
+
 def main():
     ''' Main entry point for the data conversion logic.
     '''
     
     global _version
     
-    config = misc_fns.load_json('../../conf.json')
-    _version = config['version']
-    log_path = config[_CONF_KEY]['log_path']
-    url_map = misc_fns.load_json(config[_CONF_KEY]['url_map_path'])
-    namespace_map = misc_fns.load_json(config[_CONF_KEY]['namespace_map_path'])
-    triples_map = misc_fns.load_json(config[_CONF_KEY]['triples_map_path'])
+    converter = Converter()
+    _version = converter.version
+    log_path = converter.log_path
 
     misc_fns.validate_filepath(os.path.split(log_path)[0], 'output')
     misc_fns.setup_logging(log_path)
 
     logging.info('################################## Start ##################################')
     start_time = time.time()
-    user_args(url_map, triples_map, namespace_map)
+    user_args(converter)
     end_time = time.time()
     elapsed_time = end_time - start_time
     logging.info(f'Estimated execution time: {elapsed_time} seconds (this is a rough estimate for debugging).')
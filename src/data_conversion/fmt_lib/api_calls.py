@@ -1,16 +1,15 @@
 ''' Functions to handle API calls for getting supplementary data during the TSV to JSON conversion. 
 '''
 
-from pymed import PubMed
-import requests
 import re 
 from typing import Union
-from dotenv import load_dotenv
 import os
 from time import sleep
-import xml.etree.ElementTree as ET
-from xml.etree.ElementTree import ParseError
 from fmt_lib import misc_functions as misc_fns
+from fmt_lib import metrics
+
+# the network clients (requests, pymed, dotenv) and the XML parser are imported inside the 
+# functions that use them, so they are only loaded once an API call actually has to be made
 
 DOID_API_ENDPOINT = 'https://www.disease-ontology.org/api/metadata/DOID:'
 UNIPROT_API_ENDPOINT = 'https://www.ebi.ac.uk/proteins/api/proteins/'
@@ -19,6 +18,27 @@ CO_API_ENDPOINT = 'https://www.ebi.ac.uk/ols4/api/ontologies/cl/terms/http%253A%
 HGNC_ENDPOINT = 'https://rest.genenames.org/fetch/hgnc_id/'
 NCBI_API_ENDPOINT = 'https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esummary.fcgi?db={db_replace}&id={id_replace}&api_key={api_key_replace}&email={email_replace}'
 
+# directory of the mapping data (API response caches), resolved from this file so it does not depend on the cwd
+DEFAULT_MAPPING_DATA_PATH = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..', 'mapping_data'))
+_mapping_data_path = DEFAULT_MAPPING_DATA_PATH
+
+def set_mapping_data_path(mapping_data_path: str) -> None:
+    ''' Sets the directory the mapping data caches are read from and written to.
+
+    Parameters
+    ----------
+    mapping_data_path: str
+        Path to the mapping data directory.
+    '''
+    global _mapping_data_path
+    _mapping_data_path = mapping_data_path
+
+def _mapping_path(*path_parts: str) -> str:
+    ''' Builds the path to a file in the mapping data directory.
+    '''
+    return os.path.join(_mapping_data_path, *path_parts)
+
+@metrics.timed_lookup('doid')
 def get_doid_data(doid_id: str, max_retries: int = 3, timeout: int = 5) -> Union[dict, None]:
     ''' Gets the DOID data for the given DOID ID.
 
@@ -38,10 +58,13 @@ def get_doid_data(doid_id: str, max_retries: int = 3, timeout: int = 5) -> Union
     '''
     doid_id = doid_id.strip()
     # first check DOID cache and see if information is there to avoid duplicate API calls
-    doid_map = misc_fns.load_json('../../mapping_data/doid_map.json')
+    doid_map = misc_fns.load_json(_mapping_path('doid_map.json'))
     if doid_id in doid_map:
+        metrics.record_cache_hit()
         return doid_map[doid_id]    
 
+    import requests
+
     attempt = 0
     while attempt < max_retries:
         try:
@@ -71,11 +94,12 @@ def get_doid_data(doid_id: str, max_retries: int = 3, timeout: int = 5) -> Union
             return_data = {'recommended_name': doid_name, 'description': doid_description, 'synonyms': synonyms} 
             # write back to cache 
             doid_map[doid_id] = return_data
-            misc_fns.write_json('../../mapping_data/doid_map.json', doid_map)
+            misc_fns.write_json(_mapping_path('doid_map.json'), doid_map)
             return return_data
         except (requests.ConnectionError, requests.Timeout, requests.HTTPError) as e:
             misc_fns.print_and_log(f'Warning: Failed to connect to DOID API on attempt {attempt + 1}.\n{e}\nRetrying...', 'warning')
             attempt += 1
+            metrics.record_retry()
             sleep(1)
             continue
         except Exception as e:
@@ -85,6 +109,7 @@ def get_doid_data(doid_id: str, max_retries: int = 3, timeout: int = 5) -> Union
     misc_fns.print_and_log(f'Failed to retrive DOID data after {max_retries} attempts.', 'error')
     return None
 
+@metrics.timed_lookup('pubmed')
 def get_pubmed_data(pubmed_id: str) -> tuple:
     ''' Gets the PubMed data for the given PubMed ID.
 
@@ -100,10 +125,15 @@ def get_pubmed_data(pubmed_id: str) -> tuple:
     '''
     pubmed_id = pubmed_id.strip()
     # check PubMed cache and see if information is there to avoid duplicate API calls
-    pubmed_map = misc_fns.load_json('../../mapping_data/pubmed_map.json')
+    pubmed_map = misc_fns.load_json(_mapping_path('pubmed_map.json'))
     if pubmed_id in pubmed_map:
+        metrics.record_cache_hit()
         return 0, pubmed_map[pubmed_id]
     
+    from dotenv import load_dotenv
+    from pymed import PubMed
+    from xml.etree.ElementTree import ParseError
+
     # load local environment variables
     load_dotenv()
     # get email from environment variables
@@ -154,9 +184,10 @@ def get_pubmed_data(pubmed_id: str) -> tuple:
     }
     # add data to cache
     pubmed_map[pubmed_id] = return_data
-    misc_fns.write_json('../../mapping_data/pubmed_map.json', pubmed_map)
+    misc_fns.write_json(_mapping_path('pubmed_map.json'), pubmed_map)
     return 1, return_data
 
+@metrics.timed_lookup('uniprot')
 def get_uniprot_data(uniprot_id: str, assessed_entity_type: str) -> tuple:
     ''' Gets the UniProt data for the given UniProt ID.
 
@@ -174,10 +205,13 @@ def get_uniprot_data(uniprot_id: str, assessed_entity_type: str) -> tuple:
     '''
     uniprot_id = uniprot_id.strip()
     # check UniProt cache and see if information is there to avoid duplicate API calls
-    uniprot_map = misc_fns.load_json('../../mapping_data/uniprot_map.json')
+    uniprot_map = misc_fns.load_json(_mapping_path('uniprot_map.json'))
     if uniprot_id in uniprot_map:
+        metrics.record_cache_hit()
         return 0, uniprot_map[uniprot_id]
     
+    import requests
+
     response = requests.get(UNIPROT_API_ENDPOINT + uniprot_id)
 
     # handle errors
@@ -201,9 +235,10 @@ def get_uniprot_data(uniprot_id: str, assessed_entity_type: str) -> tuple:
     }
     # add data to cache
     uniprot_map[uniprot_id] = return_data
-    misc_fns.write_json('../../mapping_data/uniprot_map.json', uniprot_map)
+    misc_fns.write_json(_mapping_path('uniprot_map.json'), uniprot_map)
     return 1, return_data
 
+@metrics.timed_lookup('chebi')
 def get_chebi_data(chebi_id: str, max_retries: int = 3, timeout: int = 5) -> tuple:
     ''' Gets the ChEBI data for the given ChEBI ID.
 
@@ -221,7 +256,7 @@ def get_chebi_data(chebi_id: str, max_retries: int = 3, timeout: int = 5) -> tup
     dict
         Indicator if an API call was made and the ChEBI name and synonym data for the given ChEBI ID.
     '''
-    mapping_data_path = '../../mapping_data/chebi_map/'
+    mapping_data_path = _mapping_path('chebi_map') + os.sep
     chebi_maps = {
         '1_4': f'{mapping_data_path}chebi_map_1_1_4.json',
         '1_9': f'{mapping_data_path}chebi_map_1_5_9.json',
@@ -263,8 +298,12 @@ def get_chebi_data(chebi_id: str, max_retries: int = 3, timeout: int = 5) -> tup
         target_map = chebi_maps['9']
     chebi_map = misc_fns.load_json(target_map)
     if chebi_id in chebi_map:
+        metrics.record_cache_hit()
         return 0, chebi_map[chebi_id]
     
+    import requests
+    import xml.etree.ElementTree as ET
+
     ns = {'chebi': 'https://www.ebi.ac.uk/webservices/chebi'}
     attempt = 0
     while attempt < max_retries:
@@ -289,6 +328,7 @@ def get_chebi_data(chebi_id: str, max_retries: int = 3, timeout: int = 5) -> tup
         except (requests.ConnectionError, requests.Timeout, requests.HTTPError) as e:
             misc_fns.print_and_log(f'Warning: Failed to connect to ChEBI API on attempt {attempt + 1}.\n{e}\nRetrying...', 'warning')
             attempt += 1
+            metrics.record_retry()
             sleep(1)
             continue
         except Exception as e:
@@ -298,6 +338,7 @@ def get_chebi_data(chebi_id: str, max_retries: int = 3, timeout: int = 5) -> tup
     misc_fns.print_and_log(f'Failed to retrive ChEBI data for ChEBI ID \'{chebi_id}\' after {max_retries} attempts.', 'error')
     return 1, None
 
+@metrics.timed_lookup('co')
 def get_co_data(co_id: str, max_retries: int = 3, timeout: int = 5) -> tuple:
     ''' Gets the Cell Ontology data for the given Cell Ontology ID.
 
@@ -320,10 +361,13 @@ def get_co_data(co_id: str, max_retries: int = 3, timeout: int = 5) -> tuple:
     if co_id.startswith('cl'):
         co_id = co_id.replace('cl', 'CL')
     # check Cell Ontology cache and see if information is there to avoid duplicate API calls
-    co_map = misc_fns.load_json('../../mapping_data/co_map.json')
+    co_map = misc_fns.load_json(_mapping_path('co_map.json'))
     if co_id in co_map:
+        metrics.record_cache_hit()
         return 0, co_map[co_id]
     
+    import requests
+
     attempt = 0
     while attempt < max_retries:
         try:
@@ -345,11 +389,12 @@ def get_co_data(co_id: str, max_retries: int = 3, timeout: int = 5) -> tuple:
             }
             # add data to cache
             co_map[co_id] = return_data
-            misc_fns.write_json('../../mapping_data/co_map.json', co_map)
+            misc_fns.write_json(_mapping_path('co_map.json'), co_map)
             return 1, return_data
         except (requests.ConnectionError, requests.Timeout, requests.HTTPError) as e:
             misc_fns.print_and_log(f'Warning: Failed to connect to Cell Ontology API on attempt {attempt + 1} for ID \'{co_id}\'.\n{e}\nRetrying...', 'warning')
             attempt += 1
+            metrics.record_retry()
             sleep(1)
             continue
         except Exception as e:
@@ -359,6 +404,7 @@ def get_co_data(co_id: str, max_retries: int = 3, timeout: int = 5) -> tuple:
     misc_fns.print_and_log(f'Failed to retrive Cell Ontology data for CO ID \'{co_id}\' after {max_retries} attempts.', 'error')
     return 1, None
 
+@metrics.timed_lookup('hgnc')
 def get_hgnc_data(hgnc_id: str, max_retries: int = 3, timeout: int = 5) -> tuple:
     ''' Gets the HGNC data for the given HGNC ID.
 
@@ -378,10 +424,13 @@ def get_hgnc_data(hgnc_id: str, max_retries: int = 3, timeout: int = 5) -> tuple
     '''
     hgnc_id = hgnc_id.strip()
     # check HGNC cache and see if information is there to avoid duplicate API calls
-    hgnc_map = misc_fns.load_json('../../mapping_data/hgnc_map.json')
+    hgnc_map = misc_fns.load_json(_mapping_path('hgnc_map.json'))
     if hgnc_id in hgnc_map:
+        metrics.record_cache_hit()
         return 0, hgnc_map[hgnc_id]
     
+    import requests
+
     attempt = 0
     while attempt < max_retries:
         try:
@@ -405,11 +454,12 @@ def get_hgnc_data(hgnc_id: str, max_retries: int = 3, timeout: int = 5) -> tuple
             }
             # add data to cache
             hgnc_map[hgnc_id] = return_data
-            misc_fns.write_json('../../mapping_data/hgnc_map.json', hgnc_map)
+            misc_fns.write_json(_mapping_path('hgnc_map.json'), hgnc_map)
             return 1, return_data
         except (requests.ConnectionError, requests.Timeout, requests.HTTPError) as e:
             misc_fns.print_and_log(f'Warning: Failed to connect to HGNC API on attempt {attempt + 1}.\n{e}\nRetrying...', 'warning')
             attempt += 1
+            metrics.record_retry()
             sleep(1)
             continue
         except Exception as e:
@@ -419,6 +469,7 @@ def get_hgnc_data(hgnc_id: str, max_retries: int = 3, timeout: int = 5) -> tuple
     misc_fns.print_and_log(f'Failed to retrive HGNC data for HGNC ID \'{hgnc_id}\' after {max_retries} attempts.', 'error')
     return 1, None
 
+@metrics.timed_lookup('ncbi')
 def get_ncbi_data(ncbi_id: str, entity_type: str, max_retries: int = 3, timeout: int = 5) -> tuple:
     ''' Gets the NCBI data for the given NCBI ID from the specified database.
 
@@ -444,7 +495,7 @@ def get_ncbi_data(ncbi_id: str, entity_type: str, max_retries: int = 3, timeout:
     if entity_type not in {'gene'}:
         misc_fns.log_once(f'Error: Unsupported entity type \'{entity_type}\' for NCBI synonym retrieval. Supported types: gene.', 'info')
         return 0, None
-    map_path = '../../mapping_data/ncbi_map/'
+    map_path = _mapping_path('ncbi_map') + os.sep
     # check NCBI cache and see if information is there to avoid duplicate API calls
     if entity_type == 'gene': 
         map_path += 'ncbi_gene_map.json'
@@ -452,8 +503,13 @@ def get_ncbi_data(ncbi_id: str, entity_type: str, max_retries: int = 3, timeout:
         endpoint = NCBI_API_ENDPOINT.replace('{db_replace}', 'gene')
         endpoint = endpoint.replace('{id_replace}', ncbi_id)
     if ncbi_id in ncbi_map:
+        metrics.record_cache_hit()
         return 0, ncbi_map[ncbi_id]
     
+    import requests
+    import xml.etree.ElementTree as ET
+    from dotenv import load_dotenv
+
     # load local environment variables
     load_dotenv()
     email = os.getenv('EMAIL')
@@ -501,6 +557,7 @@ def get_ncbi_data(ncbi_id: str, entity_type: str, max_retries: int = 3, timeout:
         except (requests.ConnectionError, requests.Timeout, requests.HTTPError) as e:
             misc_fns.print_and_log(f'Warning: Failed to connect to NCBI API on attempt {attempt + 1}.\n{e}\nRetrying...', 'warning')
             attempt += 1
+            metrics.record_retry()
             sleep(1)
             continue
         except Exception as e:
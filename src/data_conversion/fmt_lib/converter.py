@@ -0,0 +1,265 @@
+''' In-process library API for the data conversions. A `Converter` loads the config and the maps once
+and can then convert any number of files without spawning the CLI for each one, for example:
+
+    from fmt_lib.converter import Converter
+
+    converter = Converter()
+    converter.convert('biomarkers.json', 'biomarkers.nt')
+    converter.convert('biomarkers.tsv', 'biomarkers.json', metadata = False, validate = True)
+    converter.convert('biomarkers.tsv', 'biomarkers.nt', json_filepath = 'biomarkers.json')
+
+All paths are explicit or resolved relative to this repository, so the conversions do not depend on
+the current working directory.
+'''
+
+import os
+import sys
+import contextlib
+from typing import Optional
+from fmt_lib import misc_functions as misc_fns
+from fmt_lib import metrics
+
+# the converter modules are imported only once the conversion type is known, so a run only loads
+# what it needs (for example a JSON -> NT run never imports the network clients used by TSV -> JSON)
+
+_CONF_KEY = 'data_conversion'
+# directory the relative paths in the config file are resolved against (where the CLI is run from)
+CONVERSION_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+DEFAULT_CONFIG_PATH = os.path.normpath(os.path.join(CONVERSION_DIR, '..', '..', 'conf.json'))
+TSV_HEADERS = ['biomarker_id', 'biomarker', 'assessed_biomarker_entity', 'assessed_biomarker_entity_id',
+            'assessed_entity_type', 'condition', 'condition_id', 'exposure_agent', 'exposure_agent_id',
+            'best_biomarker_role', 'specimen', 'specimen_id', 'loinc_code', 'evidence_source', 'evidence',
+            'tag']
+# file formats of the conversions, given explicitly or taken from the file extension (each file can 
+# also be gzip (.gz) or zstandard (.zst) compressed). The data model can be a JSON array (json) or 
+# JSON Lines, one entry per line (jsonl)
+JSON_FORMATS = ('json', 'jsonl')
+RDF_FORMATS = ('nt', 'ttl')
+SOURCE_FORMATS = JSON_FORMATS + ('tsv',)
+TARGET_FORMATS = JSON_FORMATS + ('tsv',) + RDF_FORMATS
+SOURCE_EXTENSIONS = tuple(f'.{source_format}' for source_format in SOURCE_FORMATS)
+
+class Converter:
+    ''' Converts between the data formats using maps loaded once at construction.
+
+    Parameters
+    ----------
+    config_path: str (default: the repository conf.json)
+        Filepath to the config file. Relative paths inside the config file are resolved against
+        the `src/data_conversion/` directory.
+    mapping_data_path: str (default: the repository mapping_data directory)
+        Directory of the mapping data caches used by the TSV -> JSON metadata retrieval.
+    item_schema_path: str (default: the item schema of the config version)
+        Filepath to the item schema used to validate TSV -> JSON conversions.
+    '''
+
+    def __init__(self, config_path: str = None, mapping_data_path: str = None, item_schema_path: str = None) -> None:
+        self.config_path = config_path or DEFAULT_CONFIG_PATH
+        self.config = misc_fns.load_json(self.config_path)
+        self.version = self.config['version']
+        conversion_config = self.config[_CONF_KEY]
+        self.log_path = resolve_path(conversion_config['log_path'])
+        self.url_map = misc_fns.load_json(resolve_path(conversion_config['url_map_path']))
+        self.namespace_map = misc_fns.load_json(resolve_path(conversion_config['namespace_map_path']))
+        self.triples_map = misc_fns.load_json(resolve_path(conversion_config['triples_map_path']))
+        self.mapping_data_path = mapping_data_path
+        self.item_schema_path = item_schema_path or resolve_path(
+            os.path.join(conversion_config['schema_path'], f'v{self.version}', self.config['schema_generation']['item_output_file'])
+        )
+        self._validator = None
+        # per-stage timing and throughput metrics of the last conversion (see fmt_lib.metrics)
+        self.last_metrics = None
+
+    @property
+    def validator(self):
+        ''' The item schema validator, compiled on first use.
+        '''
+        if self._validator is None:
+            from fmt_lib import schema_validation as schema_val
+            misc_fns.validate_filepath(self.item_schema_path, 'input')
+            self._validator = schema_val.load_item_validator(self.item_schema_path, resolve_path(self.config[_CONF_KEY]['schema_path']))
+        return self._validator
+
+    def convert(self, source_filepath: str, target_filepath: str, chunk: int = 10_000, log: bool = False, metadata: bool = True,
+                workers: int = 1, dedup: bool = False, validate: bool = False, compact: bool = False,
+                source_format: str = None, target_format: str = None, json_filepath: str = None, previous_filepath: str = None,
+                checkpoint: bool = False, resume: bool = False, row_hashes: bool = False, metrics_filepath: str = None, prometheus_filepath: str = None) -> None:
+        ''' Converts a single source file, the conversion type is determined by the file formats. 
+        A filepath of `-` reads the source from stdin or writes the target to stdout, in which case 
+        its format has to be passed and any messages are printed to stderr instead of stdout. The 
+        per-stage timing and throughput metrics of the conversion are logged and kept in `last_metrics`.
+
+        Parameters
+        ----------
+        source_filepath: str
+            Filepath of the source file.
+        target_filepath: str
+            Filepath of the target file.
+        chunk: int (default: 10,000)
+            Log checkpoint.
+        log: bool (default: False)
+            Whether to print a message when the log checkpoint is hit.
+        metadata: bool (default: True)
+            Whether to attempt automatic metadata retrieval for TSV -> JSON conversions.
+        workers: int (default: 1)
+            Number of worker processes for JSON/TSV -> NT/TTL conversions.
+        dedup: bool (default: False)
+            Whether to remove duplicate triples across the whole dataset for JSON/TSV -> NT/TTL conversions.
+        validate: bool (default: False)
+            Whether to validate each entry against the item schema for TSV -> JSON conversions.
+        compact: bool (default: False)
+            Whether to write compact instead of indented JSON for TSV -> JSON conversions.
+        source_format: str (default: determined by the source filepath)
+            Format of the source file (see SOURCE_FORMATS), required when reading from stdin.
+        target_format: str (default: determined by the target filepath)
+            Format of the target file (see TARGET_FORMATS), required when writing to stdout.
+        json_filepath: str (default: None)
+            For TSV -> NT/TTL conversions, also write the entries to this JSON (or JSON Lines) file.
+        previous_filepath: str (default: None)
+            For TSV -> JSON conversions, the previous JSON output to rebuild incrementally against, only the 
+            entries whose TSV rows changed are rebuilt.
+        checkpoint: bool (default: False)
+            For TSV -> JSON/NT/TTL conversions, whether to write a checkpoint next to the target file every `chunk`
+            rows so an interrupted conversion can be resumed.
+        resume: bool (default: False)
+            For TSV -> JSON/NT/TTL conversions, whether to resume from the checkpoint left next to the target file
+            by an interrupted conversion, implies `checkpoint`.
+        row_hashes: bool (default: False)
+            For TSV -> JSON conversions (and TSV -> NT/TTL conversions with a JSON filepath), whether to write the
+            row hashes next to the JSON output so it can be the previous output of the next incremental rebuild.
+            Always done for incremental rebuilds.
+        metrics_filepath: str (default: None)
+            If passed, the metrics of the conversion are also written to this JSON file.
+        prometheus_filepath: str (default: None)
+            If passed, the metrics of the conversion (including the per-resource metadata cache and API 
+            latency metrics) are also written to this Prometheus textfile.
+
+        Raises
+        ------
+        ValueError: If the file formats do not indicate a supported conversion.
+        '''
+        error = get_conversion_error(source_filepath, target_filepath, source_format, target_format)
+        if error:
+            misc_fns.print_and_log(error, 'error')
+            raise ValueError(error)
+        source_format = get_file_format(source_filepath, source_format)
+        target_format = get_file_format(target_filepath, target_format)
+        if previous_filepath:
+            if source_format != 'tsv' or target_format not in JSON_FORMATS:
+                error = 'Error: Incremental rebuilds against a previous output are only supported for TSV -> JSON conversions.'
+            elif source_filepath == misc_fns.STDIO_PATH:
+                error = 'Error: Incremental rebuilds read the source twice and can\'t read it from stdin.'
+            if error:
+                misc_fns.print_and_log(error, 'error')
+                raise ValueError(error)
+            misc_fns.validate_filepath(previous_filepath, 'input')
+
+        # keep stdout clean for the data when the target is written to it
+        if target_filepath == misc_fns.STDIO_PATH:
+            output_context = contextlib.redirect_stdout(sys.stderr)
+        else:
+            output_context = contextlib.nullcontext()
+
+        metrics.reset()
+        with output_context:
+            if source_format in JSON_FORMATS:
+                jsonl = source_format == 'jsonl'
+                if target_format == 'tsv':
+                    from fmt_lib import json_to_tsv as j_to_t
+                    j_to_t.json_to_tsv(source_filepath, target_filepath, TSV_HEADERS, chunk, log, jsonl)
+                else:
+                    from fmt_lib import json_to_nt as j_to_nt
+                    j_to_nt.json_to_nt(source_filepath, target_filepath, self.triples_map, self.namespace_map, workers, dedup,
+                                       jsonl, target_format == 'ttl')
+            else:
+                from fmt_lib import api_calls as data_api
+                data_api.set_mapping_data_path(self.mapping_data_path or data_api.DEFAULT_MAPPING_DATA_PATH)
+                validator = self.validator if validate else None
+                if target_format in RDF_FORMATS:
+                    from fmt_lib import tsv_to_nt as t_to_nt
+                    t_to_nt.tsv_to_nt(source_filepath, target_filepath, TSV_HEADERS, self.url_map, self.namespace_map, self.triples_map, chunk,
+                                      log, metadata, workers, dedup, target_format == 'ttl', json_filepath, validator, compact, checkpoint, resume, row_hashes)
+                else:
+                    from fmt_lib import tsv_to_json as t_to_j
+                    t_to_j.tsv_to_json(source_filepath, target_filepath, TSV_HEADERS, self.url_map, self.namespace_map, chunk, log, metadata,
+                                       validator, compact, target_format == 'jsonl', previous_filepath, checkpoint, resume, row_hashes)
+        metrics.finish()
+        self.last_metrics = metrics.get_metrics()
+        metrics.log_metrics(self.last_metrics)
+        if metrics_filepath:
+            metrics.write_metrics(metrics_filepath, self.last_metrics)
+        if prometheus_filepath:
+            metrics.write_prometheus(prometheus_filepath, [({}, self.last_metrics)])
+
+def resolve_path(path: str) -> str:
+    ''' Resolves a path from the config file against the `src/data_conversion/` directory.
+
+    Parameters
+    ----------
+    path: str
+        The (relative or absolute) path.
+
+    Returns
+    -------
+    str
+        The resolved path.
+    '''
+    return os.path.normpath(os.path.join(CONVERSION_DIR, path))
+
+def get_file_format(filepath: str, file_format: str = None) -> Optional[str]:
+    ''' Gets the format of a file, the explicitly passed format or otherwise the file extension 
+    (ignoring any compression extension).
+
+    Parameters
+    ----------
+    filepath: str
+        The filepath.
+    file_format: str (default: None)
+        The explicitly passed format.
+
+    Returns
+    -------
+    str or None
+        The format (e.g. 'json' or 'nt'), None if it can't be determined.
+    '''
+    if file_format:
+        return file_format
+    if filepath == misc_fns.STDIO_PATH:
+        return None
+    extension = os.path.splitext(misc_fns.strip_compression_extension(filepath))[1]
+    return extension[1:] if extension[1:] in TARGET_FORMATS else None
+
+def get_conversion_error(source_filepath: str, target_filepath: str, source_format: str = None, target_format: str = None) -> Optional[str]:
+    ''' Checks that the source and target file formats indicate a supported conversion type.
+
+    Parameters
+    ----------
+    source_filepath: str
+        Filepath of the source file.
+    target_filepath: str
+        Filepath of the target file.
+    source_format: str (default: determined by the source filepath)
+        Format of the source file.
+    target_format: str (default: determined by the target filepath)
+        Format of the target file.
+
+    Returns
+    -------
+    str or None
+        The error message if the conversion is not supported, None otherwise.
+    '''
+    if source_filepath == misc_fns.STDIO_PATH and not source_format:
+        return 'Error: The source format (--from) is required when reading the source from stdin.'
+    if target_filepath == misc_fns.STDIO_PATH and not target_format:
+        return 'Error: The target format (--to) is required when writing the target to stdout.'
+    source_format = get_file_format(source_filepath, source_format)
+    target_format = get_file_format(target_filepath, target_format)
+    if source_format in JSON_FORMATS:
+        if target_format not in ('tsv',) + RDF_FORMATS:
+            return 'Error: Incorrect target_filepath file type for source type of JSON, expects TSV, NT, or TTL.'
+    elif source_format == 'tsv':
+        if target_format not in JSON_FORMATS + RDF_FORMATS:
+            return 'Error: Incorrect target_filepath file type for source type of TSV, expects JSON, JSONL, NT, or TTL.'
+    else:
+        return 'Error: Incorrect source_filepath file type, expects JSON, JSONL, or TSV.'
+    return None
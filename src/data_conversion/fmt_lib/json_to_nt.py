@@ -2,106 +2,528 @@
 """
 
 from fmt_lib import misc_functions as misc_fns
-from typing import Union
+from collections import deque
+from functools import partial
+from heapq import merge
+from itertools import islice
+from multiprocessing import Pool
+from typing import IO, Callable, Iterable, Iterator, Optional, Union
+import contextlib
+import os
+import re
+import tempfile
 
 # triple category keys
 SUBJECT_OBJECTS = "subject_objects"
 PREDICATES = "predicates"
+NAMESPACE_OBJECTS = "namespace_objects"
 
 # replace value
 REPLACE_VALUE = "{replace}"
 
+# Turtle output
+TURTLE_EXTENSION = ".ttl"
+TURTLE_LOCAL_NAME = re.compile(r"[A-Za-z0-9_]([A-Za-z0-9_.-]*[A-Za-z0-9_-])?")
+
+# maps the assessed entity type to the object key for namespaces that resolve
+# to a different object depending on the entity type (ex. NCBI gene vs compound)
+ENTITY_TYPE_OBJECT_KEYS = {"gene": "gene", "chemical element": "compound"}
+
+# order the biomarker change keywords are checked in, any other keywords in the
+# triples map are checked afterwards
+BIOMARKER_CHANGE_PRECEDENCE = ("increase", "decrease", "absence", "presence")
+
+
+def _dbsnp_id(entity_id: str) -> str:
+    """dbSNP reference SNP IDs use a lowercase `rs` prefix."""
+    return entity_id.replace("RS", "rs")
+
+
+# per object key ID transforms applied before the ID is formatted into the URI
+ID_TRANSFORMS = {"dbsnp": _dbsnp_id}
+
+# number of entries sent to a worker process at a time for parallel conversions
+WORKER_BATCH_SIZE = 1_000
+
+# number of triples held in memory before a sorted run is spilled to disk when
+# de-duplicating across the whole dataset
+DEDUP_RUN_SIZE = 500_000
+
+# compiled URI map for the current worker process
+_worker_uri_map: dict = {}
+
 
 def json_to_nt(
-    source_filepath: str, target_filepath: str, triples_map: dict, namespace_map
+    source_filepath: str,
+    target_filepath: str,
+    triples_map: dict,
+    namespace_map,
+    workers: int = 1,
+    dedup: bool = False,
+    jsonl: Optional[bool] = None,
+    turtle: Optional[bool] = None,
 ) -> None:
-    """Converts the JSON data model format to the N-Triples (nt) format.
+    """Converts the JSON data model format to the N-Triples (nt) format. The source
+    entries are streamed and the triples for each entry are written as soon as they
+    are built, so memory usage does not grow with the size of the dataset. If the
+    target filepath ends with `.ttl` (or `.ttl.gz`/`.ttl.zst`) the triples are written
+    in the compact Turtle format instead. If the target filepath ends with `.gz` or
+    `.zst` the output is gzip or zstandard compressed.
+
+    Duplicate triples within an entry are always removed. Duplicates across entries
+    (ex. the same biomarker ID appearing in multiple entries) are only removed if
+    `dedup` is set, in which case the triples are run through an external sort so
+    memory usage stays bounded, and the output is written in sorted order.
 
     Parameters
     ----------
     source_filepath : str
-        The path to the source JSON file to convert.
+        The path to the source JSON (or JSON Lines) file to convert.
     target_filepath : str
-        The path to the target nt file to generate.
+        The path to the target nt or ttl file to generate.
     triples_map : dict
         The triples map to use for the conversion.
     namespace_map : dict
         The namespace map to use for the conversion.
+    workers : int (default: 1)
+        Number of worker processes to build the triples with. The output order
+        matches the source order regardless of the number of workers.
+    dedup : bool (default: False)
+        Whether to remove duplicate triples across the whole dataset.
+    jsonl : bool or None (default: None)
+        Whether the source is JSON Lines, determined by the source filepath if None.
+    turtle : bool or None (default: None)
+        Whether to write Turtle, determined by the target filepath if None.
     """
+    entries = misc_fns.stream_json(source_filepath, jsonl)
+    if turtle is None:
+        turtle = misc_fns.strip_compression_extension(target_filepath).endswith(
+            TURTLE_EXTENSION
+        )
+    entries_to_nt(
+        entries, target_filepath, triples_map, namespace_map, workers, dedup, turtle
+    )
 
-    # get the JSON source data
-    json_data = misc_fns.load_json(source_filepath)
-
-    final_triples = []
 
-    # iterate through top level entries
-    for idx, entry in enumerate(json_data):
+def entries_to_nt(
+    entries: Iterable[dict],
+    target_filepath: str,
+    triples_map: dict,
+    namespace_map,
+    workers: int = 1,
+    dedup: bool = False,
+    turtle: bool = False,
+) -> None:
+    """Writes the triples of the data model entries, in the N-Triples or Turtle
+    format. The entries can come from any source, ex. streamed from a JSON file or
+    built in memory by the TSV -> JSON conversion.
 
-        entry_triples = []
-        biomarker_subject_uri = create_biomarker_subect_uri(
-            entry["biomarker_id"], triples_map[SUBJECT_OBJECTS]["biomarker_id"]
-        )
+    Parameters
+    ----------
+    entries : Iterable[dict]
+        The data model entries.
+    target_filepath : str
+        The path to the target nt or ttl file to generate.
+    triples_map : dict
+        The triples map to use for the conversion.
+    namespace_map : dict
+        The namespace map to use for the conversion.
+    workers : int (default: 1)
+        Number of worker processes to build the triples with.
+    dedup : bool (default: False)
+        Whether to remove duplicate triples across the whole dataset.
+    turtle : bool (default: False)
+        Whether to write Turtle instead of N-Triples.
+    """
+    uri_map = compile_uri_map(triples_map, namespace_map)
 
-        # iterate through biomarker component entries
-        for biomarker_component in entry["biomarker_component"]:
-
-            ### handle change in entity triple
-            biomarker = biomarker_component["biomarker"]
-            assessed_biomarker_entity_id = biomarker_component[
-                "assessed_biomarker_entity_id"
-            ]
-            assessed_entity_type = biomarker_component["assessed_entity_type"].strip().lower()
-            change_triple = build_biomarker_change_triple(
-                biomarker_subject_uri,
-                biomarker,
-                assessed_biomarker_entity_id,
-                assessed_entity_type,
-                triples_map,
-                namespace_map,
+    if workers > 1:
+        triple_batches = _build_triples_parallel(entries, uri_map, workers)
+    else:
+        triple_batches = (build_entry_triples(entry, uri_map) for entry in entries)
+
+    with contextlib.ExitStack() as stack:
+        f = stack.enter_context(misc_fns.open_text(target_filepath, "w"))
+        if dedup:
+            # the dedup runs are spilled next to the target file (or the default temp
+            # directory for stdout), no temp directory is created without dedup
+            temp_dir = (
+                None
+                if target_filepath == misc_fns.STDIO_PATH
+                else os.path.dirname(os.path.abspath(target_filepath))
             )
-            if change_triple is not None:
-                entry_triples.append(change_triple)
+            run_dir = stack.enter_context(tempfile.TemporaryDirectory(dir=temp_dir))
+            triple_batches = _sort_unique(triple_batches, run_dir)
+        if turtle:
+            _write_turtle(triple_batches, f, build_turtle_prefixes(triples_map))
+        else:
+            for triples in triple_batches:
+                if triples:
+                    f.write("\n".join(triples) + "\n")
+
+
+def _sort_unique(triple_batches: Iterable[list], run_dir: str) -> Iterator[list]:
+    """Sorts and de-duplicates the triples using an external sort. Triples are
+    collected into runs of at most `DEDUP_RUN_SIZE` triples which are sorted,
+    de-duplicated, and spilled to temporary files, then the runs are merged.
+
+    Parameters
+    ----------
+    triple_batches : Iterable[list]
+        The triples, in batches.
+    run_dir : str
+        Directory to write the temporary run files to.
+
+    Returns
+    -------
+    Iterator[list]
+        The sorted unique triples, in batches.
+    """
+    run_paths = []
+    run: set = set()
+    for triples in triple_batches:
+        run.update(triples)
+        if len(run) >= DEDUP_RUN_SIZE:
+            run_path = os.path.join(run_dir, f"run_{len(run_paths)}.nt")
+            with open(run_path, "w", encoding="utf-8") as run_file:
+                run_file.writelines(f"{triple}\n" for triple in sorted(run))
+            run_paths.append(run_path)
+            run = set()
+
+    run_files = [open(run_path, "r", encoding="utf-8") for run_path in run_paths]
+    try:
+        batch: list = []
+        last_triple = None
+        in_memory_run = (f"{triple}\n" for triple in sorted(run))
+        for triple in merge(in_memory_run, *run_files):
+            if triple == last_triple:
+                continue
+            last_triple = triple
+            batch.append(triple[:-1])
+            if len(batch) >= WORKER_BATCH_SIZE:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+    finally:
+        for run_file in run_files:
+            run_file.close()
+
+
+def build_turtle_prefixes(triples_map: dict) -> dict:
+    """Derives the Turtle prefixes from the URIs in the triples map. The namespace
+    of each URI is the portion up to the last `/` or `#` before the replace value.
+    Namespaces used by a single triples map entry are named after its key, shared
+    namespaces (ex. the OBO PURLs) are named after their last path segment.
+
+    Parameters
+    ----------
+    triples_map : dict
+        The triples map to use for the conversion.
+
+    Returns
+    -------
+    dict
+        Dictionary mapping each namespace IRI to its prefix name.
+    """
+    namespace_keys: dict = {}
+
+    def collect(node: Union[dict, str], key: str) -> None:
+        if isinstance(node, dict):
+            for child_key, child in node.items():
+                collect(child, f"{key}_{child_key}" if key else child_key)
+            return
+        iri = node.strip("<>").split(REPLACE_VALUE)[0]
+        namespace = iri[: max(iri.rfind("/"), iri.rfind("#")) + 1]
+        namespace_keys.setdefault(namespace, []).append(key)
+
+    collect(triples_map[SUBJECT_OBJECTS], "")
+    collect(triples_map[PREDICATES], "")
+
+    prefixes = {}
+    for namespace, keys in namespace_keys.items():
+        if len(keys) == 1:
+            prefix = keys[0]
+        else:
+            prefix = namespace.rstrip("/#").rsplit("/", 1)[-1]
+        prefix = re.sub(r"[^A-Za-z0-9_]", "_", prefix).lower()
+        if not prefix[:1].isalpha():
+            prefix = f"ns_{prefix}"
+        # keep prefix names unique
+        candidate, count = prefix, 1
+        while candidate in prefixes.values():
+            count += 1
+            candidate = f"{prefix}{count}"
+        prefixes[namespace] = candidate
+
+    return prefixes
+
+
+def _write_turtle(triple_batches: Iterable[list], f: IO[str], prefixes: dict) -> None:
+    """Writes the triples in the Turtle format. Consecutive triples that share a
+    subject are grouped into a single block, and IRIs are shortened to prefixed
+    names where the local name allows it.
+
+    Parameters
+    ----------
+    triple_batches : Iterable[list]
+        The triples to write, in batches.
+    f : IO[str]
+        The output file handle.
+    prefixes : dict
+        Dictionary mapping each namespace IRI to its prefix name.
+    """
+    for namespace, prefix in sorted(prefixes.items(), key=lambda item: item[1]):
+        f.write(f"@prefix {prefix}: <{namespace}> .\n")
+    f.write("\n")
+
+    # longest namespaces first so the most specific prefix is used
+    namespaces = sorted(prefixes.items(), key=lambda item: len(item[0]), reverse=True)
+
+    def compact(term: str) -> str:
+        iri = term[1:-1]
+        for namespace, prefix in namespaces:
+            if iri.startswith(namespace):
+                local_name = iri[len(namespace) :]
+                if TURTLE_LOCAL_NAME.fullmatch(local_name):
+                    return f"{prefix}:{local_name}"
+                break
+        return term
+
+    current_subject = None
+    predicate_objects: dict = {}
+    for triples in triple_batches:
+        for triple in triples:
+            subject, predicate, obj = triple[:-2].split(" ", 2)
+            if subject != current_subject:
+                if current_subject is not None:
+                    _write_turtle_block(compact(current_subject), predicate_objects, f)
+                current_subject = subject
+                predicate_objects = {}
+            predicate_objects.setdefault(compact(predicate), []).append(compact(obj))
+    if current_subject is not None:
+        _write_turtle_block(compact(current_subject), predicate_objects, f)
+
+
+def _write_turtle_block(subject: str, predicate_objects: dict, f: IO[str]) -> None:
+    """Writes the predicates and objects for a single subject in the Turtle format."""
+    predicate_lines = [
+        f"{predicate} {', '.join(objects)}"
+        for predicate, objects in predicate_objects.items()
+    ]
+    f.write(f"{subject} " + " ;\n    ".join(predicate_lines) + " .\n")
+
+
+def _build_triples_parallel(
+    entries: Iterable[dict], uri_map: dict, workers: int
+) -> Iterator[list]:
+    """Builds the triples for batches of entries across a pool of worker processes.
+    At most two batches per worker are in flight at a time so memory usage stays
+    bounded, and the batches are yielded back in the source order.
+
+    Parameters
+    ----------
+    entries : Iterable[dict]
+        The biomarker entries.
+    uri_map : dict
+        The compiled URI map (see `compile_uri_map`).
+    workers : int
+        Number of worker processes.
+
+    Returns
+    -------
+    Iterator[list]
+        The triples for each batch of entries.
+    """
+    max_pending = workers * 2
+    with Pool(workers, initializer=_init_worker, initargs=(uri_map,)) as pool:
+        pending: deque = deque()
+        entries = iter(entries)
+        while batch := list(islice(entries, WORKER_BATCH_SIZE)):
+            pending.append(pool.apply_async(_build_batch_triples, (batch,)))
+            if len(pending) >= max_pending:
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
 
-            ### handle specimen triple
-            specimens = biomarker_component.get("specimen", [])
-            specimen_triples = build_specimen_triples(
-                biomarker_subject_uri, specimens, triples_map, namespace_map
+
+def _init_worker(uri_map: dict) -> None:
+    """Stores the compiled URI map in the worker process."""
+    global _worker_uri_map
+    _worker_uri_map = uri_map
+
+
+def _build_batch_triples(batch: list) -> list:
+    """Builds the triples for a batch of entries in a worker process."""
+    batch_triples = []
+    for entry in batch:
+        batch_triples.extend(build_entry_triples(entry, _worker_uri_map))
+    return batch_triples
+
+
+def compile_uri_map(triples_map: dict, namespace_map: dict) -> dict:
+    """Compiles the triples map and namespace map into the lookup tables used by
+    the triple builders. Each namespace prefix is resolved once to a URI formatter
+    so building an object URI is a single dict lookup and format call.
+
+    Parameters
+    ----------
+    triples_map : dict
+        The triples map to use for the conversion.
+    namespace_map : dict
+        The namespace map to use for the conversion.
+
+    Returns
+    -------
+    dict
+        The compiled URI map.
+    """
+    subject_objects = triples_map[SUBJECT_OBJECTS]
+    predicates = triples_map[PREDICATES]
+    uri_map = {
+        "biomarker_id": _compile_formatter(subject_objects["biomarker_id"]),
+        "biomarker_change": tuple(
+            sorted(
+                predicates["biomarker_change"].items(),
+                key=lambda item: BIOMARKER_CHANGE_PRECEDENCE.index(item[0])
+                if item[0] in BIOMARKER_CHANGE_PRECEDENCE
+                else len(BIOMARKER_CHANGE_PRECEDENCE),
             )
-            if specimen_triples is not None:
-                entry_triples.extend(specimen_triples)
+        ),
+        "best_biomarker_role": predicates["best_biomarker_role"],
+        "role_objects": subject_objects["best_biomarker_role"],
+        "specimen_sampled_from": predicates["specimen_sampled_from"],
+        "condition_role_indicator": predicates["condition_role_indicator"],
+    }
+
+    # resolve each namespace prefix to the formatter for its object URI
+    for category, namespace_objects in triples_map[NAMESPACE_OBJECTS].items():
+        prefix_formatters = {}
+        for prefix, namespace in namespace_map.items():
+            object_key = namespace_objects.get(namespace)
+            if object_key is None:
+                continue
+            template = subject_objects[object_key]
+            if isinstance(template, dict):
+                prefix_formatters[prefix] = {
+                    entity_type: _compile_formatter(template[key], object_key)
+                    for entity_type, key in ENTITY_TYPE_OBJECT_KEYS.items()
+                    if key in template
+                }
+            else:
+                prefix_formatters[prefix] = _compile_formatter(template, object_key)
+        uri_map[category] = prefix_formatters
+
+    return uri_map
+
 
-        ### handle best biomarker role triple
-        roles = entry["best_biomarker_role"]
-        role_triples = build_biomarker_role_triples(
-            biomarker_subject_uri, roles, triples_map
+def _compile_formatter(template: str, object_key: str = "") -> Callable[[str], str]:
+    """Compiles a triples map URI template into a formatter function.
+
+    Parameters
+    ----------
+    template : str
+        The URI template containing the replace value.
+    object_key : str (default: "")
+        The triples map object key, used to look up any ID transform.
+
+    Returns
+    -------
+    Callable[[str], str]
+        Function that takes an ID and returns the formatted URI.
+    """
+    # the template is split on the replace value rather than turned into a format string so any
+    # literal braces in the URI are kept as is
+    formatter = partial(_format_uri, tuple(template.split(REPLACE_VALUE)))
+    id_transform = ID_TRANSFORMS.get(object_key)
+    if id_transform is None:
+        return formatter
+    return partial(_transform_and_format, formatter, id_transform)
+
+
+def _format_uri(template_parts: tuple, entity_id: str) -> str:
+    """Fills in the ID between the parts of the URI template."""
+    return entity_id.join(template_parts)
+
+
+def _transform_and_format(
+    formatter: Callable[[str], str], id_transform: Callable[[str], str], entity_id: str
+) -> str:
+    """Applies the ID transform before formatting the URI."""
+    return formatter(id_transform(entity_id))
+
+
+def build_entry_triples(entry: dict, uri_map: dict) -> list:
+    """Builds all of the triples for a single top level biomarker entry.
+
+    Parameters
+    ----------
+    entry : dict
+        The biomarker entry.
+    uri_map : dict
+        The compiled URI map (see `compile_uri_map`).
+
+    Returns
+    -------
+    list
+        The entry triples.
+    """
+    entry_triples = []
+    biomarker_subject_uri = create_biomarker_subect_uri(
+        entry["biomarker_id"], uri_map["biomarker_id"]
+    )
+
+    # iterate through biomarker component entries
+    for biomarker_component in entry["biomarker_component"]:
+
+        ### handle change in entity triple
+        biomarker = biomarker_component["biomarker"]
+        assessed_biomarker_entity_id = biomarker_component[
+            "assessed_biomarker_entity_id"
+        ]
+        assessed_entity_type = biomarker_component["assessed_entity_type"].strip().lower()
+        change_triple = build_biomarker_change_triple(
+            biomarker_subject_uri,
+            biomarker,
+            assessed_biomarker_entity_id,
+            assessed_entity_type,
+            uri_map,
         )
-        if role_triples:
-            entry_triples.extend(role_triples)
-
-        ### handle the condition triple
-        if entry.get("condition", None):
-            condition = entry["condition"]["id"]
-            condition_triple = build_condition_triple(
-                biomarker_subject_uri, condition, roles, triples_map, namespace_map
-            )
-            if condition_triple:
-                entry_triples.extend(condition_triple)
+        if change_triple is not None:
+            entry_triples.append(change_triple)
 
-        # add the entry triples to the final triples
-        final_triples.extend(entry_triples)
+        ### handle specimen triple
+        specimens = biomarker_component.get("specimen", [])
+        specimen_triples = build_specimen_triples(
+            biomarker_subject_uri, specimens, uri_map
+        )
+        if specimen_triples is not None:
+            entry_triples.extend(specimen_triples)
+
+    ### handle best biomarker role triple
+    roles = entry["best_biomarker_role"]
+    role_triples = build_biomarker_role_triples(biomarker_subject_uri, roles, uri_map)
+    if role_triples:
+        entry_triples.extend(role_triples)
+
+    ### handle the condition triple
+    if entry.get("condition", None):
+        condition = entry["condition"]["id"]
+        condition_triple = build_condition_triple(
+            biomarker_subject_uri, condition, roles, uri_map
+        )
+        if condition_triple:
+            entry_triples.extend(condition_triple)
 
-    # write the final triples to the target nt file
-    triples = "\n".join(final_triples)
-    with open(target_filepath, "w") as f:
-        f.write(triples)
+    # remove duplicates within the entry while keeping the original order
+    return list(dict.fromkeys(entry_triples))
 
 
 def build_condition_triple(
     biomarker_subject_uri: str,
     condition: str,
     roles: list,
-    triples_map: dict,
-    namespace_map: dict,
+    uri_map: dict,
 ) -> list:
     """Builds the condition triple.
 
@@ -113,10 +535,8 @@ def build_condition_triple(
         The condition name space and ID.
     roles : list
         The best_biomarker roles list.
-    triples_map : dict
-        The triples map to use for the conversion.
-    namespace_map : dict
-        The namespace map to use for the conversion.
+    uri_map : dict
+        The compiled URI map (see `compile_uri_map`).
 
     Returns
     -------
@@ -125,41 +545,29 @@ def build_condition_triple(
     """
     condition_triples = []
     condition_name_space = condition.split(":")[0].lower()
-    if condition_name_space in namespace_map:
-        if namespace_map[condition_name_space] == "disease ontology":
-            doid_id = condition.split(":")[1]
-            condition_object_uri = triples_map[SUBJECT_OBJECTS]["doid"].replace(
-                REPLACE_VALUE, doid_id
-            )
-            for role_entry in roles:
-                role = role_entry["role"].lower()
-                condition_predicate_map = triples_map[PREDICATES][
-                    "condition_role_indicator"
-                ]
-                if role == "diagnostic":
-                    predicate_uri = condition_predicate_map["diagnostic"]
-                elif role == "risk":
-                    predicate_uri = condition_predicate_map["risk"]
-                elif role == "monitoring":
-                    predicate_uri = condition_predicate_map["monitoring"]
-                elif role == "prognostic":
-                    predicate_uri = condition_predicate_map["prognostic"]
-                else:
-                    continue
-                condition_triples.append(
-                    f"{biomarker_subject_uri} {predicate_uri} {condition_object_uri} ."
-                )
-    else:
+    condition_formatter = uri_map["condition"].get(condition_name_space)
+    if condition_formatter is None:
         misc_fns.log_once(
             f"build_condition_triple: No namespace URI map found for condition name space: '{condition_name_space}'",
             "info",
         )
+        return condition_triples
+
+    condition_object_uri = condition_formatter(condition.split(":")[1])
+    condition_predicate_map = uri_map["condition_role_indicator"]
+    for role_entry in roles:
+        predicate_uri = condition_predicate_map.get(role_entry["role"].lower())
+        if predicate_uri is None:
+            continue
+        condition_triples.append(
+            f"{biomarker_subject_uri} {predicate_uri} {condition_object_uri} ."
+        )
 
     return condition_triples
 
 
 def build_specimen_triples(
-    biomarker_subject_uri: str, specimens: list, triples_map: dict, namespace_map: dict
+    biomarker_subject_uri: str, specimens: list, uri_map: dict
 ) -> list:
     """Builds the specimen triples.
 
@@ -169,10 +577,8 @@ def build_specimen_triples(
         The biomarker subject URI.
     specimens : list
         The specimens list.
-    triples_map : dict
-        The triples map to use for the conversion.
-    namespace_map : dict
-        The namespace map to use for the conversion.
+    uri_map : dict
+        The compiled URI map (see `compile_uri_map`).
 
     Returns
     -------
@@ -180,31 +586,32 @@ def build_specimen_triples(
         The specimen triples.
     """
     specimen_triples = []
-    specimen_predicate_uri = triples_map[PREDICATES]["specimen_sampled_from"]
+    specimen_predicate_uri = uri_map["specimen_sampled_from"]
+    specimen_formatters = uri_map["specimen"]
 
     for specimen in specimens:
-        if specimen.get("name_space", "") != "":
-            if specimen["name_space"].lower() in namespace_map:
-                if namespace_map[specimen["name_space"].lower()] == "uberon":
-                    specimen_id = specimen.get("id", None)
-                    if specimen_id:
-                        uberon_sample_uri = triples_map[SUBJECT_OBJECTS][
-                            "uberon"
-                        ].replace(REPLACE_VALUE, specimen_id.split(":")[1])
-                        specimen_triples.append(
-                            f"{biomarker_subject_uri} {specimen_predicate_uri} {uberon_sample_uri} ."
-                        )
-            else:
-                misc_fns.log_once(
-                    f"build_specimen_triples: No namespace URI found for specimen: '{specimen}'",
-                    "info",
-                )
+        name_space = specimen.get("name_space", "")
+        if name_space == "":
+            continue
+        specimen_formatter = specimen_formatters.get(name_space.lower())
+        if specimen_formatter is None:
+            misc_fns.log_once(
+                f"build_specimen_triples: No namespace URI found for specimen: '{specimen}'",
+                "info",
+            )
+            continue
+        specimen_id = specimen.get("id", None)
+        if specimen_id:
+            specimen_uri = specimen_formatter(specimen_id.split(":")[1])
+            specimen_triples.append(
+                f"{biomarker_subject_uri} {specimen_predicate_uri} {specimen_uri} ."
+            )
 
     return specimen_triples
 
 
 def build_biomarker_role_triples(
-    biomarker_subject_uri: str, roles: dict, triples_map: dict
+    biomarker_subject_uri: str, roles: list, uri_map: dict
 ) -> list:
     """Builds the best biomarker role triples.
 
@@ -212,10 +619,10 @@ def build_biomarker_role_triples(
     ----------
     biomarker_subject_uri : str
         The biomarker subject URI.
-    roles : dict
-        The roles dictionary.
-    triples_map : dict
-        The triples map to use for the conversion.
+    roles : list
+        The best_biomarker roles list.
+    uri_map : dict
+        The compiled URI map (see `compile_uri_map`).
 
     Returns
     -------
@@ -223,25 +630,12 @@ def build_biomarker_role_triples(
         The best biomarker role triples.
     """
     role_triples = []
-    role_predicate_uri = triples_map[PREDICATES]["best_biomarker_role"]
-    role_object_map = triples_map[SUBJECT_OBJECTS]["best_biomarker_role"]
+    role_predicate_uri = uri_map["best_biomarker_role"]
+    role_object_map = uri_map["role_objects"]
     for role_dict in roles:
         role = role_dict["role"]
-        if role.lower() == "risk":
-            role_object_uri = role_object_map["risk"]
-        elif role.lower() == "diagnostic":
-            role_object_uri = role_object_map["diagnostic"]
-        elif role.lower() == "prognostic":
-            role_object_uri = role_object_map["prognostic"]
-        elif role.lower() == "monitoring":
-            role_object_uri = role_object_map["monitoring"]
-        elif role.lower() == "predictive":
-            role_object_uri = role_object_map["predictive"]
-        elif role.lower() == "response":
-            role_object_uri = role_object_map["response"]
-        elif role.lower() == "safety":
-            role_object_uri = role_object_map["safety"]
-        else:
+        role_object_uri = role_object_map.get(role.lower())
+        if role_object_uri is None:
             misc_fns.log_once(
                 f"build_biomarker_role_triples: No role URI found for role: '{role}'",
                 "info",
@@ -259,8 +653,7 @@ def build_biomarker_change_triple(
     biomarker_change: str,
     assessed_biomarker_entity_id: str,
     assessed_entity_type: str,
-    triples_map: dict,
-    namespace_map: dict,
+    uri_map: dict,
 ) -> Union[str, None]:
     """Builds the biomarker change triple.
 
@@ -274,10 +667,8 @@ def build_biomarker_change_triple(
         The assessed biomarker entity ID.
     assessed_entity_type : str
         The assessed entity type.
-    triples_map : dict
-        The triples map to use for the conversion.
-    namespace_map : dict
-        The namespace map to use for the conversion.
+    uri_map : dict
+        The compiled URI map (see `compile_uri_map`).
 
     Returns
     -------
@@ -285,15 +676,11 @@ def build_biomarker_change_triple(
         The biomarker change triple.
     """
     # get predicate URI
-    change_key = "biomarker_change"
-    if "increase" in biomarker_change.lower():
-        predicate_uri = triples_map[PREDICATES][change_key]["increase"]
-    elif "decrease" in biomarker_change.lower():
-        predicate_uri = triples_map[PREDICATES][change_key]["decrease"]
-    elif "absence" in biomarker_change.lower():
-        predicate_uri = triples_map[PREDICATES][change_key]["absence"]
-    elif "presence" in biomarker_change.lower():
-        predicate_uri = triples_map[PREDICATES][change_key]["presence"]
+    biomarker_change_lower = biomarker_change.lower()
+    for change, change_predicate_uri in uri_map["biomarker_change"]:
+        if change in biomarker_change_lower:
+            predicate_uri = change_predicate_uri
+            break
     else:
         misc_fns.log_once(
             f"build_biomarker_change_triple: No change predicate found for biomarker change: '{biomarker_change}'",
@@ -303,97 +690,45 @@ def build_biomarker_change_triple(
 
     # get object URI
     entity_namespace = assessed_biomarker_entity_id.split(":")[0].lower()
-    if entity_namespace in namespace_map:
-        entity_id = assessed_biomarker_entity_id.split(":")[1].strip().upper()
-        namespace_value = namespace_map[entity_namespace]
-        if namespace_value == "uniprot":
-            object_uri = triples_map[SUBJECT_OBJECTS]["uniprot"].replace(
-                REPLACE_VALUE, entity_id
-            )
-        elif namespace_value == "cell ontology":
-            object_uri = triples_map[SUBJECT_OBJECTS]["cell_ontology"].replace(
-                REPLACE_VALUE, entity_id
-            )
-        elif namespace_value == "protein ontology":
-            object_uri = triples_map[SUBJECT_OBJECTS]["protein_ontology"].replace(
-                REPLACE_VALUE, entity_id
-            )
-        elif namespace_value == "chebi":
-            object_uri = triples_map[SUBJECT_OBJECTS]["chebi"].replace(
-                REPLACE_VALUE, entity_id
-            )
-        elif namespace_value == "ncit":
-            object_uri = triples_map[SUBJECT_OBJECTS]["ncit"].replace(
-                REPLACE_VALUE, entity_id
-            )
-        elif namespace_value == "dbsnp":
-            object_uri = triples_map[SUBJECT_OBJECTS]["dbsnp"].replace(
-                REPLACE_VALUE, entity_id.replace("RS", "rs")
-            )
-        elif namespace_value == "pubchem id":
-            object_uri = triples_map[SUBJECT_OBJECTS]["pccid"].replace(
-                REPLACE_VALUE, entity_id
-            )
-        elif namespace_value == "protein data bank":
-            object_uri = triples_map[SUBJECT_OBJECTS]["pccid"].replace(
-                REPLACE_VALUE, entity_id
-            )
-        elif namespace_value == "mirbase":
-            object_uri = triples_map[SUBJECT_OBJECTS]["mrb"].replace(
-                REPLACE_VALUE, entity_id
-            )
-        elif namespace_value == "rna central":
-            object_uri = triples_map[SUBJECT_OBJECTS]["rnac"].replace(
-                REPLACE_VALUE, entity_id
-            )
-        elif namespace_value == "glytoucan":
-            object_uri = triples_map[SUBJECT_OBJECTS]["gtc"].replace(
-                REPLACE_VALUE, entity_id
-            )
-        elif namespace_value == "ncbi":
-            if assessed_entity_type == "gene":
-                object_uri = triples_map[SUBJECT_OBJECTS]["ncbi"]["gene"].replace(
-                    REPLACE_VALUE, entity_id
-                )
-            elif assessed_entity_type == "chemical element":
-                object_uri = triples_map[SUBJECT_OBJECTS]["ncbi"]["compound"].replace(
-                    REPLACE_VALUE, entity_id
-                )
-            else:
-                misc_fns.log_once(
-                    f"build_biomarker_change_triple: No object URI found for 'ncbi' entity type: '{assessed_entity_type}'",
-                    "info",
-                )
-                return None
-        else:
-            misc_fns.log_once(
-                f"build_biomarker_change_triple: No namespace object URI mapping found for entity namespace: '{entity_namespace}'",
-                "info",
-            )
-            return None
-    else:
+    object_formatter = uri_map["assessed_biomarker_entity"].get(entity_namespace)
+    if object_formatter is None:
         misc_fns.log_once(
             f"build_biomarker_change_triple: No namespace object URI mapping found for entity namespace: '{entity_namespace}'",
             "info",
         )
         return None
 
+    # namespaces that resolve by entity type (ex. NCBI gene vs compound)
+    if isinstance(object_formatter, dict):
+        entity_type_formatter = object_formatter.get(assessed_entity_type)
+        if entity_type_formatter is None:
+            misc_fns.log_once(
+                f"build_biomarker_change_triple: No object URI found for '{entity_namespace}' entity type: '{assessed_entity_type}'",
+                "info",
+            )
+            return None
+        object_formatter = entity_type_formatter
+
+    entity_id = assessed_biomarker_entity_id.split(":")[1].strip().upper()
+    object_uri = object_formatter(entity_id)
     return f"{biomarker_subject_uri} {predicate_uri} {object_uri} ."
 
 
-def create_biomarker_subect_uri(biomarker_id: str, base_url: str) -> str:
+def create_biomarker_subect_uri(
+    biomarker_id: str, formatter: Callable[[str], str]
+) -> str:
     """Creates the URI for the biomarker subject.
 
     Parameters
     ----------
     biomarker_id : str
         The biomarker ID.
-    base_url : str
-        The base URL to use for the URI.
+    formatter : Callable[[str], str]
+        The compiled biomarker subject URI formatter.
 
     Returns
     -------
     str
         The biomarker subject URI.
     """
-    return base_url.replace(REPLACE_VALUE, biomarker_id)
+    return formatter(biomarker_id)
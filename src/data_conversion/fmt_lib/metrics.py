@@ -0,0 +1,428 @@
+''' Collects the per-stage timing and throughput metrics of a conversion run, along with the cache and 
+API latency metrics of the metadata lookups per resource. The metrics are module level state (like the 
+API call counters in synonym_utils), reset at the start of each conversion. They can be written as JSON 
+or as a Prometheus textfile (for the node exporter textfile collector).
+
+The stage times are exclusive, a stage nested in another (e.g. a metadata lookup during the row build)
+is only counted in the inner stage, so the stage times add up to the time spent in the stages.
+'''
+
+import functools
+import os
+import time
+from datetime import timedelta
+from fmt_lib import misc_functions as misc_fns
+
+_start_time = time.perf_counter()
+_end_time = None
+# stage name -> {'seconds': float, 'count': int}
+_stages: dict = {}
+# stack of the running stages, [name, start time, time spent in nested stages]
+_stage_stack: list = []
+# counter name -> value
+_counters: dict = {}
+# metadata resource -> LookupStats
+_lookups: dict = {}
+# set by record_cache_hit and record_retry during a lookup
+_lookup_hit = False
+_lookup_retries = 0
+# upper bounds (in seconds) of the API latency histogram buckets
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# prefix of the Prometheus metric names
+PROMETHEUS_PREFIX = 'biomarker_conversion'
+
+class LookupStats:
+    ''' Cache and API metrics of the metadata lookups of a single resource. Each lookup has one outcome:
+
+    - hit: answered from the mapping data cache
+    - negative: no data and no API call was made (e.g. unsupported entity type or missing credentials)
+    - miss: not in the cache, an API call was made and returned data
+    - failure: not in the cache, the API call failed or returned no data
+
+    The latency of the lookups that made an API call (misses and failures) is recorded in a histogram.
+    '''
+
+    def __init__(self) -> None:
+        self.hits = 0
+        self.negative = 0
+        self.misses = 0
+        self.failures = 0
+        self.retries = 0
+        self.api_seconds = 0.0
+        # count per latency bucket, the last bucket counts the lookups above the largest bound
+        self.latency_counts = [0] * (len(LATENCY_BUCKETS) + 1)
+
+    def observe_latency(self, seconds: float) -> None:
+        ''' Records the latency of a lookup that made an API call.
+
+        Parameters
+        ----------
+        seconds: float
+            The lookup time.
+        '''
+        self.api_seconds += seconds
+        for bucket_idx, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                self.latency_counts[bucket_idx] += 1
+                return
+        self.latency_counts[-1] += 1
+
+    @property
+    def lookups(self) -> int:
+        ''' The total number of lookups.
+        '''
+        return self.hits + self.negative + self.misses + self.failures
+
+    @property
+    def hit_ratio(self) -> float:
+        ''' The share of the lookups answered from the cache.
+        '''
+        return self.hits / self.lookups if self.lookups else 0.0
+
+    def to_dict(self) -> dict:
+        ''' Returns the metrics as a dictionary, with the cumulative latency histogram keyed by the 
+        bucket upper bound.
+        '''
+        cumulative_counts = []
+        for count in self.latency_counts:
+            cumulative_counts.append(count + (cumulative_counts[-1] if cumulative_counts else 0))
+        return {
+            'hits': self.hits,
+            'negative': self.negative,
+            'misses': self.misses,
+            'failures': self.failures,
+            'retries': self.retries,
+            'hit_ratio': round(self.hit_ratio, 4),
+            'api_seconds': round(self.api_seconds, 6),
+            'latency_histogram': dict(zip([str(bound) for bound in LATENCY_BUCKETS] + ['+Inf'], cumulative_counts))
+        }
+
+def reset() -> None:
+    ''' Resets the metrics and starts the run timer.
+    '''
+    global _start_time, _end_time
+    _start_time = time.perf_counter()
+    _end_time = None
+    _stages.clear()
+    _stage_stack.clear()
+    _counters.clear()
+    _lookups.clear()
+
+def finish() -> None:
+    ''' Stops the run timer.
+    '''
+    global _end_time
+    _end_time = time.perf_counter()
+
+def start_stage(name: str) -> None:
+    ''' Starts timing a stage, a stage started while another one is running is nested in it.
+
+    Parameters
+    ----------
+    name: str
+        Name of the stage.
+    '''
+    _stage_stack.append([name, time.perf_counter(), 0.0])
+
+def stop_stage() -> None:
+    ''' Stops timing the most recently started stage, the time spent in its nested stages is excluded.
+    '''
+    name, start, nested_seconds = _stage_stack.pop()
+    elapsed = time.perf_counter() - start
+    add_time(name, elapsed - nested_seconds)
+    if _stage_stack:
+        _stage_stack[-1][2] += elapsed
+
+class stage:
+    ''' Context manager that times a stage (see start_stage).
+
+    Parameters
+    ----------
+    name: str
+        Name of the stage.
+    '''
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    def __enter__(self) -> 'stage':
+        start_stage(self.name)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        stop_stage()
+
+def add_time(name: str, seconds: float, count: int = 1) -> None:
+    ''' Adds time to a stage.
+
+    Parameters
+    ----------
+    name: str
+        Name of the stage.
+    seconds: float
+        The time to add.
+    count: int (default: 1)
+        The number of times the stage ran.
+    '''
+    stage_metrics = _stages.setdefault(name, {'seconds': 0.0, 'count': 0})
+    stage_metrics['seconds'] += seconds
+    stage_metrics['count'] += count
+
+def timed_iter(iterable, name: str):
+    ''' Yields the items of an iterable, timing the time spent getting each item as a stage (e.g.
+    the parsing of each row of a reader).
+
+    Parameters
+    ----------
+    iterable: Iterable
+        The iterable.
+    name: str
+        Name of the stage.
+
+    Returns
+    -------
+    Iterator
+        Iterator over the items.
+    '''
+    iterator = iter(iterable)
+    while True:
+        with stage(name):
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+        yield item
+
+def increment(name: str, value: int = 1) -> None:
+    ''' Increments a counter (e.g. the number of rows processed).
+
+    Parameters
+    ----------
+    name: str
+        Name of the counter.
+    value: int (default: 1)
+        The value to add.
+    '''
+    _counters[name] = _counters.get(name, 0) + value
+
+def record_cache_hit() -> None:
+    ''' Marks the running metadata lookup as answered from the mapping data cache.
+    '''
+    global _lookup_hit
+    _lookup_hit = True
+
+def record_retry() -> None:
+    ''' Counts a failed attempt of the API call of the running metadata lookup (the call is retried 
+    until the maximum number of attempts is reached).
+    '''
+    global _lookup_retries
+    _lookup_retries += 1
+
+def timed_lookup(resource: str):
+    ''' Decorator for the metadata lookup functions, which return the data (or None) or a tuple of the 
+    API call indicator and the data. Times each lookup as the `metadata_lookup` stage and records its 
+    outcome (see LookupStats) and, if an API call was made, its latency (including writing the response 
+    to the cache). The lookup functions call record_cache_hit and record_retry.
+
+    Parameters
+    ----------
+    resource: str
+        Name of the metadata resource (e.g. 'uniprot').
+    '''
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            global _lookup_hit, _lookup_retries
+            _lookup_hit = False
+            _lookup_retries = 0
+            start = time.perf_counter()
+            with stage('metadata_lookup'):
+                result = fn(*args, **kwargs)
+            seconds = time.perf_counter() - start
+            api_call, data = result if isinstance(result, tuple) else (1, result)
+            lookup_stats = get_lookup_stats(resource)
+            lookup_stats.retries += _lookup_retries
+            if _lookup_hit:
+                lookup_stats.hits += 1
+            elif not api_call:
+                lookup_stats.negative += 1
+            else:
+                if data is None:
+                    lookup_stats.failures += 1
+                else:
+                    lookup_stats.misses += 1
+                lookup_stats.observe_latency(seconds)
+            return result
+        return wrapper
+    return decorator
+
+def get_lookup_stats(resource: str) -> LookupStats:
+    ''' Returns the lookup metrics of a resource.
+
+    Parameters
+    ----------
+    resource: str
+        Name of the metadata resource (e.g. 'uniprot').
+
+    Returns
+    -------
+    LookupStats
+        The lookup metrics of the resource (created on first use).
+    '''
+    if resource not in _lookups:
+        _lookups[resource] = LookupStats()
+    return _lookups[resource]
+
+def elapsed_seconds() -> float:
+    ''' Returns the time since the start of the run (until the end if it finished).
+
+    Returns
+    -------
+    float
+        The elapsed time in seconds.
+    '''
+    return (_end_time or time.perf_counter()) - _start_time
+
+def progress_message(done: int, total: int = None, skipped: int = 0, unit: str = 'rows') -> str:
+    ''' Builds a progress message with the throughput since the start of the run and, if the total 
+    is known, the ETA.
+
+    Parameters
+    ----------
+    done: int
+        Number of items processed.
+    total: int (default: None)
+        Total number of items, if known.
+    skipped: int (default: 0)
+        Number of the processed items that were skipped by this run (e.g. when resuming).
+    unit: str (default: 'rows')
+        Name of the items.
+
+    Returns
+    -------
+    str
+        The progress message.
+    '''
+    elapsed = elapsed_seconds()
+    rate = (done - skipped) / elapsed if elapsed > 0 else 0.0
+    message = f'Processed {done:,} {unit}'
+    if total:
+        message += f' of {total:,} ({done / total:.1%})'
+    message += f', {rate:,.1f} {unit}/sec'
+    if total and rate > 0:
+        message += f', ETA {timedelta(seconds = round(max(total - done, 0) / rate))}'
+    return message
+
+def get_metrics() -> dict:
+    ''' Returns the metrics of the run.
+
+    Returns
+    -------
+    dict
+        The total time, the stages (time, count, and share of the total time), the counters (with
+        the rows per second), and the metadata lookups per resource.
+    '''
+    total_seconds = elapsed_seconds()
+    stages = {
+        name: {
+            'seconds': round(stage_metrics['seconds'], 6),
+            'count': stage_metrics['count'],
+            'share': round(stage_metrics['seconds'] / total_seconds, 4) if total_seconds > 0 else 0.0
+        }
+        for name, stage_metrics in sorted(_stages.items(), key = lambda item: -item[1]['seconds'])
+    }
+    counters = dict(_counters)
+    if 'rows' in counters and total_seconds > 0:
+        counters['rows_per_second'] = round(counters['rows'] / total_seconds, 2)
+    lookups = {resource: lookup_stats.to_dict() for resource, lookup_stats in sorted(_lookups.items())}
+    return {'total_seconds': round(total_seconds, 6), 'stages': stages, 'counters': counters, 'metadata_lookups': lookups}
+
+def log_metrics(metrics: dict) -> None:
+    ''' Logs a summary of the metrics.
+
+    Parameters
+    ----------
+    metrics: dict
+        The metrics (see get_metrics).
+    '''
+    lines = [f'Conversion metrics (total {metrics["total_seconds"]:.2f} seconds):']
+    for name, stage_metrics in metrics['stages'].items():
+        lines.append(f'\t{name:<22}{stage_metrics["seconds"]:>12.3f}s {stage_metrics["share"]:>7.1%} ({stage_metrics["count"]:,} calls)')
+    for name, value in metrics['counters'].items():
+        lines.append(f'\t{name:<22}{value:>12,}')
+    for resource, lookup_metrics in metrics['metadata_lookups'].items():
+        lines.append(f'\t{resource + " lookups":<22}{lookup_metrics["hits"]:>12,} hits ({lookup_metrics["hit_ratio"]:.1%}), {lookup_metrics["misses"]:,} misses, '
+                     f'{lookup_metrics["negative"]:,} negative, {lookup_metrics["failures"]:,} failures, {lookup_metrics["retries"]:,} retries '
+                     f'({lookup_metrics["api_seconds"]:.3f}s in API calls)')
+    misc_fns.print_and_log('\n'.join(lines), 'info')
+
+def write_metrics(filepath: str, metrics: dict) -> None:
+    ''' Writes the metrics to a JSON file.
+
+    Parameters
+    ----------
+    filepath: str
+        Filepath to the metrics file.
+    metrics: dict
+        The metrics (see get_metrics).
+    '''
+    misc_fns.write_json(filepath, metrics)
+
+def write_prometheus(filepath: str, runs: list) -> None:
+    ''' Writes the metrics in the Prometheus text exposition format, e.g. for the node exporter textfile 
+    collector. The file is written to a temporary file first and then renamed, so the collector never 
+    reads a partially written file.
+
+    Parameters
+    ----------
+    filepath: str
+        Filepath to the textfile (should end with `.prom` for the textfile collector).
+    runs: list
+        The labels (dict, e.g. the source file of a batch conversion) and the metrics (see get_metrics) 
+        of each conversion.
+    '''
+    families: dict = {}
+
+    def add(name: str, metric_type: str, help_text: str, labels: dict, value) -> None:
+        family = families.setdefault(f'{PROMETHEUS_PREFIX}_{name}', {'type': metric_type, 'help': help_text, 'samples': []})
+        family['samples'].append((labels, value))
+
+    for run_labels, run_metrics in runs:
+        add('duration_seconds', 'gauge', 'Duration of the conversion.', run_labels, run_metrics['total_seconds'])
+        for stage_name, stage_metrics in run_metrics['stages'].items():
+            add('stage_seconds', 'gauge', 'Time spent in each stage of the conversion.', {**run_labels, 'stage': stage_name}, stage_metrics['seconds'])
+        for counter_name, value in run_metrics['counters'].items():
+            if counter_name in ('rows', 'entries'):
+                add(f'{counter_name}_total', 'counter', f'Number of {counter_name} processed by the conversion.', run_labels, value)
+        for resource, lookup_metrics in run_metrics['metadata_lookups'].items():
+            resource_labels = {**run_labels, 'resource': resource}
+            for outcome in ('hits', 'negative', 'misses', 'failures'):
+                add('metadata_lookups_total', 'counter', 'Metadata lookups by resource and outcome (hits, negative, misses, failures).',
+                    {**resource_labels, 'outcome': outcome}, lookup_metrics[outcome])
+            add('metadata_api_retries_total', 'counter', 'Retried metadata API calls by resource.', resource_labels, lookup_metrics['retries'])
+            add('metadata_cache_hit_ratio', 'gauge', 'Share of the metadata lookups answered from the cache by resource.', resource_labels, lookup_metrics['hit_ratio'])
+            for bound, count in lookup_metrics['latency_histogram'].items():
+                add('metadata_api_latency_seconds_bucket', 'histogram', 'Latency of the metadata lookups that made an API call by resource.',
+                    {**resource_labels, 'le': bound}, count)
+            add('metadata_api_latency_seconds_sum', 'histogram', None, resource_labels, lookup_metrics['api_seconds'])
+            add('metadata_api_latency_seconds_count', 'histogram', None, resource_labels, lookup_metrics['misses'] + lookup_metrics['failures'])
+
+    lines = []
+    for name, family in families.items():
+        # the histogram series share the HELP and TYPE lines of the base name
+        if family['help'] is not None:
+            base_name = name[:-len('_bucket')] if name.endswith('_bucket') else name
+            lines.append(f'# HELP {base_name} {family["help"]}')
+            lines.append(f'# TYPE {base_name} {family["type"]}')
+        for labels, value in family['samples']:
+            label_string = ','.join(f'{key}="{_escape_label(str(label))}"' for key, label in labels.items())
+            lines.append(f'{name}{{{label_string}}} {value}' if label_string else f'{name} {value}')
+    temp_filepath = f'{filepath}.tmp'
+    with open(temp_filepath, 'w') as f:
+        f.write('\n'.join(lines) + '\n')
+    os.replace(temp_filepath, filepath)
+
+def _escape_label(value: str) -> str:
+    ''' Escapes a Prometheus label value.
+    '''
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
@@ -6,10 +6,28 @@ import json
 import os 
 import re
 import hashlib
-from typing import Set
+import math
+import gzip
+import io
+import sys
+import ijson
+from typing import Set, Iterable, Iterator, IO
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 logged_messages: Set[str] = set()
 MAX_LOGGED_MESSAGES = 1000
+# JSON serializer backends, orjson is used when it is installed and the stdlib json module otherwise
+JSON_BACKENDS = ('orjson', 'json')
+_json_backend = 'orjson' if orjson is not None else 'json'
+# extensions of the transparently (de)compressed file formats
+COMPRESSION_EXTENSIONS = ('.gz', '.zst')
+# JSON Lines data model files hold one biomarker entry per line instead of a single JSON array
+JSONL_EXTENSION = '.jsonl'
+# filepath that reads from stdin or writes to stdout
+STDIO_PATH = '-'
 
 def setup_logging(log_path: str) -> None:
     ''' Set up logging for the data conversion process.
@@ -51,6 +69,116 @@ def validate_filepath(filepath: str, mode: str) -> None:
         print_and_log(f'Validate_filepath error: Invalid mode {mode}', 'error')
         raise ValueError(f'Validate_filepath error: Invalid mode {mode}')
 
+def set_json_backend(backend: str) -> None:
+    ''' Sets the JSON serializer backend used to load and write JSON files.
+
+    Parameters
+    ----------
+    backend: str
+        The backend to use ('orjson' or 'json').
+
+    Raises
+    ------
+    ValueError: If the backend is invalid or not installed.
+    '''
+    global _json_backend
+    if backend not in JSON_BACKENDS:
+        print_and_log(f'Error: Invalid JSON backend {backend}, expects one of {JSON_BACKENDS}.', 'error')
+        raise ValueError(f'Error: Invalid JSON backend {backend}, expects one of {JSON_BACKENDS}.')
+    if backend == 'orjson' and orjson is None:
+        print_and_log('Error: The orjson package is not installed, install it with `pip install orjson`.', 'error')
+        raise ValueError('Error: The orjson package is not installed, install it with `pip install orjson`.')
+    _json_backend = backend
+
+def get_json_backend() -> str:
+    ''' Returns the JSON serializer backend in use.
+
+    Returns
+    -------
+    str
+        The backend ('orjson' or 'json').
+    '''
+    return _json_backend
+
+def loads_json(data):
+    ''' Deserializes a JSON document with the current backend. orjson rejects the non-standard 
+    `NaN`/`Infinity` values that the stdlib json module accepts, so documents orjson can't parse 
+    are parsed again with the json module (which raises if the document is actually invalid).
+
+    Parameters
+    ----------
+    data: bytes or str
+        The JSON document.
+
+    Raises
+    ------
+    ValueError: If the document is not valid JSON.
+
+    Returns
+    -------
+    The deserialized data.
+    '''
+    if _json_backend == 'orjson':
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(data)
+
+def dumps_json(data, compact: bool = False) -> bytes:
+    ''' Serializes data to UTF-8 encoded JSON. The default output is indented with 4 spaces 
+    and always written by the stdlib json module (orjson only supports 2 space indentation), 
+    so the indented files are identical regardless of the backend. The compact output has no 
+    whitespace and non-ASCII characters are not escaped, it is written with the current backend. 
+    orjson writes the non-finite floats (`NaN`/`Infinity`) as `null`, so data holding any of them 
+    is written with the json module instead, as the `NaN`/`Infinity` values it reads back.
+
+    Parameters
+    ----------
+    data
+        The data to serialize.
+    compact: bool (default: False)
+        Whether to write compact instead of indented JSON.
+
+    Returns
+    -------
+    bytes
+        The serialized data.
+    '''
+    if not compact:
+        return json.dumps(data, indent = 4).encode('utf-8')
+    if _json_backend == 'orjson':
+        serialized = orjson.dumps(data, option = orjson.OPT_NON_STR_KEYS)
+        # the data is only walked when orjson wrote a null, which a non-finite float would have become
+        if b'null' not in serialized or not has_non_finite_float(data):
+            return serialized
+    return json.dumps(data, ensure_ascii = False, separators = (',', ':')).encode('utf-8')
+
+def has_non_finite_float(data) -> bool:
+    ''' Checks whether the data holds a non-finite float (`NaN`, `Infinity` or `-Infinity`).
+
+    Parameters
+    ----------
+    data
+        The data to check.
+
+    Returns
+    -------
+    bool
+        True if any value in the data is a non-finite float, False otherwise.
+    '''
+    stack = [data]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, float):
+            if not math.isfinite(value):
+                return True
+        elif isinstance(value, dict):
+            stack.extend(value.values())
+        elif isinstance(value, (list, tuple)):
+            stack.extend(value)
+    return False
+
 def load_json(filepath: str) -> dict:
     ''' Loads and returns a JSON file.
 
@@ -68,10 +196,10 @@ def load_json(filepath: str) -> dict:
     dict
         The loaded JSON to return.
     '''
-    with open(filepath, 'r') as f:
-        return json.load(f)
+    with open_binary(filepath) as f:
+        return loads_json(f.read())
 
-def write_json(filepath: str, data: dict) -> None:
+def write_json(filepath: str, data: dict, compact: bool = False) -> None:
     ''' Writes the data to a JSON file.
 
     Parameters
@@ -80,9 +208,237 @@ def write_json(filepath: str, data: dict) -> None:
         Filepath to the JSON file.
     data: dict
         Data to write to the JSON file.
+    compact: bool (default: False)
+        Whether to write compact instead of indented JSON (see dumps_json).
+    '''
+    # the stdlib json module streams the document to the file handle, so the serialized document 
+    # is never held in memory as a whole
+    if compact and _json_backend == 'orjson':
+        with open_binary(filepath, 'w') as f:
+            f.write(dumps_json(data, compact))
+    else:
+        with open_text(filepath, 'w') as f:
+            if compact:
+                json.dump(data, f, ensure_ascii = False, separators = (',', ':'))
+            else:
+                json.dump(data, f, indent = 4)
+
+def write_jsonl(filepath: str, entries: Iterable[dict], append: bool = False) -> None:
+    ''' Writes the entries to a JSON Lines file, one compact JSON entry per line.
+
+    Parameters
+    ----------
+    filepath: str
+        Filepath to the JSON Lines file.
+    entries: Iterable[dict]
+        The entries to write.
+    append: bool (default: False)
+        Whether to append to the file instead of overwriting it.
+    '''
+    with open_binary(filepath, 'a' if append else 'w') as f:
+        for entry in entries:
+            f.write(dumps_json(entry, compact = True) + b'\n')
+
+def write_entries(filepath: str, entries: list, compact: bool = False, jsonl: bool = None) -> None:
+    ''' Writes the data model entries to a JSON Lines file if the filepath ends with `.jsonl`
+    (before any compression extension), otherwise to a JSON array file.
+
+    Parameters
+    ----------
+    filepath: str
+        Filepath to the target file.
+    entries: list
+        The entries to write.
+    compact: bool (default: False)
+        Whether to write a compact instead of an indented JSON array file.
+    jsonl: bool (default: None)
+        Whether to write JSON Lines, if not passed it is determined by the filepath.
+    '''
+    if jsonl is None:
+        jsonl = is_jsonl(filepath)
+    if jsonl:
+        write_jsonl(filepath, entries)
+    else:
+        write_json(filepath, entries, compact)
+
+def is_jsonl(filepath: str) -> bool:
+    ''' Checks whether a filepath is a (possibly compressed) JSON Lines file.
+
+    Parameters
+    ----------
+    filepath: str
+        The filepath.
+
+    Returns
+    -------
+    bool
+        True if the filepath ends with `.jsonl` (before any compression extension).
+    '''
+    return strip_compression_extension(filepath).endswith(JSONL_EXTENSION)
+
+def get_sidecar_filepath(target_filepath: str, suffix: str) -> str:
+    ''' Gets the filepath of a side file (e.g. a report) written next to the target file, the target 
+    filename without its extensions followed by the suffix. For a target written to stdout the side 
+    file is written to the working directory.
+
+    Parameters
+    ----------
+    target_filepath: str
+        Filepath to the target file.
+    suffix: str
+        Suffix of the side file (e.g. `_validation_report.json`).
+
+    Returns
+    -------
+    str
+        Filepath of the side file.
+    '''
+    if target_filepath == STDIO_PATH:
+        return suffix.lstrip('_')
+    base, _ = os.path.splitext(strip_compression_extension(target_filepath))
+    return f'{base}{suffix}'
+
+def strip_compression_extension(filepath: str) -> str:
+    ''' Removes the compression extension (see COMPRESSION_EXTENSIONS) from a filepath, 
+    so the underlying file type can be checked (e.g. `data.json.gz` -> `data.json`).
+
+    Parameters
+    ----------
+    filepath: str
+        The filepath.
+
+    Returns
+    -------
+    str
+        The filepath without the compression extension.
+    '''
+    for extension in COMPRESSION_EXTENSIONS:
+        if filepath.endswith(extension):
+            return filepath[:-len(extension)]
+    return filepath
+
+def open_text(filepath: str, mode: str = 'r') -> IO[str]:
+    ''' Opens a text file for reading or writing. If the filepath ends with `.gz` or 
+    `.zst` the file is transparently (de)compressed with gzip or zstandard (streaming, 
+    the file is never fully decompressed in memory or on disk).
+
+    Parameters
+    ----------
+    filepath: str
+        Filepath to the file to open.
+    mode: str (default: 'r')
+        The mode to open the file in ('r', 'w', or 'a').
+
+    Returns
+    -------
+    IO[str]
+        The opened text file handle.
+    '''
+    if filepath == STDIO_PATH:
+        return io.TextIOWrapper(_open_stdio(mode), encoding = 'utf-8')
+    if filepath.endswith('.gz'):
+        return gzip.open(filepath, f'{mode}t', encoding = 'utf-8')
+    if filepath.endswith('.zst'):
+        return io.TextIOWrapper(_open_zstd(filepath, mode), encoding = 'utf-8')
+    return open(filepath, mode, encoding = 'utf-8')
+
+def open_binary(filepath: str, mode: str = 'r') -> IO[bytes]:
+    ''' Opens a (possibly gzip or zstandard compressed) file in binary mode.
+
+    Parameters
+    ----------
+    filepath: str
+        Filepath to the file to open.
+    mode: str (default: 'r')
+        The mode to open the file in ('r', 'w', or 'a').
+
+    Returns
+    -------
+    IO[bytes]
+        The opened binary file handle.
+    '''
+    if filepath == STDIO_PATH:
+        return _open_stdio(mode)
+    if filepath.endswith('.gz'):
+        return gzip.open(filepath, f'{mode}b')
+    if filepath.endswith('.zst'):
+        return _open_zstd(filepath, mode)
+    return open(filepath, f'{mode}b')
+
+def _open_stdio(mode: str) -> IO[bytes]:
+    ''' Opens stdin (read mode) or the process stdout (write or append mode) as a binary stream. 
+    Closing the stream does not close the underlying file descriptor. The original stdout is used 
+    so that the data is still written to it while the messages are redirected (see Converter.convert).
+    '''
+    if mode == 'r':
+        return open(sys.stdin.fileno(), 'rb', closefd = False)
+    sys.__stdout__.flush()
+    return open(sys.__stdout__.fileno(), 'wb', closefd = False)
+
+def _open_zstd(filepath: str, mode: str) -> IO[bytes]:
+    ''' Opens a zstandard compressed file as a binary stream. Appending writes a new frame, 
+    and reading reads across all the frames. Requires the optional zstandard package.
+    '''
+    try:
+        import zstandard
+    except ImportError:
+        print_and_log(f'Error: The zstandard package is required for .zst files ({filepath}), install it with `pip install zstandard`.', 'error')
+        raise
+    raw = open(filepath, f'{mode}b')
+    if mode == 'r':
+        return zstandard.ZstdDecompressor().stream_reader(raw, read_across_frames = True, closefd = True)
+    return zstandard.ZstdCompressor().stream_writer(raw, closefd = True)
+
+def stream_json(filepath: str, jsonl: bool = None) -> Iterator[dict]:
+    ''' Lazily yields the top level entries of a JSON array file (or the lines of a 
+    JSON Lines file) without loading the full file into memory.
+
+    Parameters
+    ----------
+    filepath: str
+        Filepath to the JSON or JSON Lines file.
+    jsonl: bool (default: None)
+        Whether the file is JSON Lines, if not passed it is determined by the filepath.
+
+    Returns
+    -------
+    Iterator[dict]
+        Iterator over the top level entries.
+    '''
+    if jsonl is None:
+        jsonl = is_jsonl(filepath)
+    if jsonl:
+        yield from stream_jsonl(filepath)
+        return
+    with open_binary(filepath) as f:
+        yield from ijson.items(f, 'item', use_float = True)
+
+def stream_jsonl(filepath: str) -> Iterator[dict]:
+    ''' Lazily yields the entries of a JSON Lines file, blank lines are skipped.
+
+    Parameters
+    ----------
+    filepath: str
+        Filepath to the JSON Lines file.
+
+    Raises
+    ------
+    ValueError: If a line is not valid JSON.
+
+    Returns
+    -------
+    Iterator[dict]
+        Iterator over the entries.
     '''
-    with open(filepath, 'w') as f:
-        json.dump(data, f, indent = 4)
+    with open_text(filepath, 'r') as f:
+        for line_number, line in enumerate(f, start = 1):
+            if not line.strip():
+                continue
+            try:
+                yield loads_json(line)
+            except ValueError as e:
+                print_and_log(f'Error: Invalid JSON on line {line_number} of {filepath}: {e}', 'error')
+                raise ValueError(f'Error: Invalid JSON on line {line_number} of {filepath}: {e}')
 
 def clean_string(string: str) -> str:
     ''' Cleans a string by removing all non-alphanumeric characters and
@@ -0,0 +1,63 @@
+''' Profiling hooks for the data conversion entry point.
+'''
+
+import contextlib
+import logging
+import sys
+from typing import Iterator
+
+# number of functions (and memory allocation sites) listed in the profile summary
+PROFILE_TOP_N = 30
+
+@contextlib.contextmanager
+def profile_run(profile_prefix: str, enabled: bool = True, memory: bool = False, top: int = PROFILE_TOP_N) -> Iterator[None]:
+    ''' Profiles the code run inside the context with cProfile (and optionally tracemalloc). The raw 
+    stats are written to `<profile_prefix>_profile.pstats` (load them with pstats or a viewer like 
+    snakeviz) and the top functions by cumulative and internal time, along with the peak memory and 
+    the top allocation sites, to `<profile_prefix>_profile.txt`. Only the current process is profiled 
+    (not the worker processes of parallel runs).
+
+    Parameters
+    ----------
+    profile_prefix : str
+        Filepath prefix of the profile files (e.g. the log filepath without its extension).
+    enabled : bool (default: True)
+        Whether to profile, if False the context does nothing.
+    memory : bool (default: False)
+        Whether to also trace the memory allocations with tracemalloc (slows the run down considerably).
+    top : int (default: PROFILE_TOP_N)
+        Number of functions and allocation sites listed in the summary.
+    '''
+    if not enabled:
+        yield
+        return
+    import cProfile
+    import pstats
+    import tracemalloc
+    if memory:
+        tracemalloc.start()
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        snapshot, peak = None, None
+        if memory:
+            snapshot = tracemalloc.take_snapshot()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        stats_filepath = f'{profile_prefix}_profile.pstats'
+        summary_filepath = f'{profile_prefix}_profile.txt'
+        profiler.dump_stats(stats_filepath)
+        with open(summary_filepath, 'w') as f:
+            stats = pstats.Stats(stats_filepath, stream = f)
+            for sort_key in ('cumulative', 'tottime'):
+                f.write(f'Top {top} functions by {sort_key} time:\n')
+                stats.sort_stats(sort_key).print_stats(top)
+            if memory:
+                f.write(f'Peak traced memory: {peak / 1_000_000:.1f} MB\n\nTop {top} allocation sites at the end of the run:\n')
+                for stat in snapshot.statistics('lineno')[:top]:
+                    f.write(f'{stat}\n')
+        logging.info(f'Profile written to {stats_filepath} and {summary_filepath}.')
+        print(f'Profile written to {stats_filepath} and {summary_filepath}.', file = sys.stderr)
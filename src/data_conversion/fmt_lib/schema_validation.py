@@ -0,0 +1,113 @@
+''' Handles validating the converted biomarker entries against the data model item schema.
+'''
+
+import os
+import importlib.util
+from types import ModuleType
+from jsonschema.validators import validator_for
+from jsonschema.protocols import Validator
+from fmt_lib import misc_functions as misc_fns
+
+REPORT_SUFFIX = '_validation_report.json'
+# module of the schema directory holding the schema helpers shared with the data validator
+SCHEMA_UTILS_FILENAME = 'schema_utils.py'
+# the shared schema helpers, loaded along with the item validator
+_schema_utils = None
+
+def load_schema_utils(schema_dirpath: str) -> ModuleType:
+    ''' Loads the schema helpers shared with the data validator (see schema/schema_utils.py) from 
+    the schema directory, without adding the directory to the import path. The module is only 
+    loaded once.
+
+    Parameters
+    ----------
+    schema_dirpath : str
+        Path to the schema directory.
+
+    Returns
+    -------
+    ModuleType
+        The schema helpers module.
+    '''
+    global _schema_utils
+    if _schema_utils is None:
+        schema_utils_filepath = os.path.join(schema_dirpath, SCHEMA_UTILS_FILENAME)
+        misc_fns.validate_filepath(schema_utils_filepath, 'input')
+        spec = importlib.util.spec_from_file_location('schema_utils', schema_utils_filepath)
+        schema_utils = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(schema_utils)
+        _schema_utils = schema_utils
+    return _schema_utils
+
+def load_item_validator(schema_filepath: str, schema_dirpath: str) -> Validator:
+    ''' Loads and compiles the validator for a single biomarker entry. Accepts the standalone item
+    schema or the array schema (in which case its items schema is used, with the same shared 
+    definitions as in the data validator).
+
+    Parameters
+    ----------
+    schema_filepath : str
+        Filepath to the schema file.
+    schema_dirpath : str
+        Path to the schema directory the shared schema helpers are loaded from (see load_schema_utils).
+
+    Returns
+    -------
+    Validator
+        The compiled entry validator.
+    '''
+    schema = load_schema_utils(schema_dirpath).get_item_schema(misc_fns.load_json(schema_filepath))
+    validator_class = validator_for(schema)
+    validator_class.check_schema(schema)
+    return validator_class(schema)
+
+def get_report_filepath(target_filepath: str) -> str:
+    ''' Gets the filepath of the validation report written next to the target file.
+
+    Parameters
+    ----------
+    target_filepath : str
+        Filepath to the target JSON file.
+
+    Returns
+    -------
+    str
+        Filepath of the validation report.
+    '''
+    return misc_fns.get_sidecar_filepath(target_filepath, REPORT_SUFFIX)
+
+def validate_entry(entry: dict, validator: Validator) -> list:
+    ''' Validates a single biomarker entry, the validator has to be loaded with load_item_validator.
+
+    Parameters
+    ----------
+    entry : dict
+        The biomarker entry.
+    validator : Validator
+        The compiled entry validator.
+
+    Returns
+    -------
+    list
+        The formatted error messages, empty if the entry is valid.
+    '''
+    return [_schema_utils.format_error(error) for error in validator.iter_errors(entry)]
+
+def write_report(report_filepath: str, failures: list, entry_count: int) -> None:
+    ''' Writes the validation failures to the side report and logs the summary.
+
+    Parameters
+    ----------
+    report_filepath : str
+        Filepath of the validation report.
+    failures : list
+        The failure records (index, biomarker_id and errors).
+    entry_count : int
+        The number of entries validated.
+    '''
+    misc_fns.write_json(report_filepath, failures)
+    if failures:
+        misc_fns.print_and_log(f'Validation failed for {len(failures)} of {entry_count} entries, see {report_filepath}.', 'warning')
+    else:
+        misc_fns.print_and_log(f'Validation successful for all {entry_count} entries.', 'info')
+        print(f'Validation successful for all {entry_count} entries.')
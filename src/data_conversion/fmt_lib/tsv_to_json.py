@@ -2,13 +2,25 @@
 '''
 
 import csv 
+import hashlib
+import json
+import os
 from fmt_lib import misc_functions as misc_fns
 from fmt_lib import tsv_to_json_utils as utils
 from fmt_lib import synonym_utils as syn_utils
+from fmt_lib import metrics
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    from jsonschema.protocols import Validator
 
 ADD_CITATION_DATA = True
+# suffix of the row group hashes written next to the target file for the next incremental rebuild
+ROW_HASHES_SUFFIX = '_row_hashes.json'
+# suffix of the checkpoint written next to the target file while the entries are built
+CHECKPOINT_SUFFIX = '_checkpoint.jsonl'
 
-def tsv_to_json(source_filepath: str, target_filepath: str, tsv_headers: list, url_map: dict, name_space_map: dict, chunk: int = 10_000, log: bool = False, metadata: bool = True) -> None:
+def tsv_to_json(source_filepath: str, target_filepath: str, tsv_headers: list, url_map: dict, name_space_map: dict, chunk: int = 10_000, log: bool = False, metadata: bool = True, validator: 'Validator' = None, compact: bool = False, jsonl: bool = None, previous_filepath: str = None, checkpoint: bool = False, resume: bool = False, row_hashes: bool = False) -> None:
     ''' Entry point for the TSV -> JSON conversion.
 
     Parameters
@@ -16,7 +28,81 @@ def tsv_to_json(source_filepath: str, target_filepath: str, tsv_headers: list, u
     source_filepath : str
         Filepath to the source TSV file.
     target_filepath : str
-        Filepath to the target JSON file to generate.
+        Filepath to the target JSON (or JSON Lines) file to generate.
+    tsv_headers : list
+        List of the headers in the TSV file.
+    url_map : dict
+        Dictionary that provides mappings for name space's to base URL's. This assists with URL construction.
+    name_space_map : dict
+        Dictionary that provides mappings for name space acronym's to full name space names.
+    chunk : int (default: 10,000)
+        Log and checkpoint interval (see build_entries).
+    log : bool (default: False)
+        Whether to print a message when the log checkpoint is hit.
+    metadata : bool (default: True)
+         Whether to attempt automatic metadata retrieval.
+    validator : Validator (default: None)
+        If passed, each finalized entry is validated against the item schema and the failures are 
+        written to a side report next to the target file.
+    compact : bool (default: False)
+        Whether to write compact instead of indented JSON (ignored for JSON Lines targets).
+    jsonl : bool (default: None)
+        Whether to write JSON Lines, if not passed it is determined by the target filepath.
+    previous_filepath : str (default: None)
+        If passed, the previous JSON output to rebuild incrementally against (see build_entries_incremental).
+    checkpoint : bool (default: False)
+        Whether to write a checkpoint next to the target file every `chunk` rows so an interrupted 
+        conversion can be resumed.
+    resume : bool (default: False)
+        Whether to resume from the checkpoint left next to the target file by an interrupted conversion, 
+        implies `checkpoint`.
+    row_hashes : bool (default: False)
+        Whether to write the row hashes of the source file next to the target file, so it can be the 
+        previous output of the next incremental rebuild. Always done for incremental rebuilds.
+    '''
+    # checkpoints are written next to the target file, a stream can't be checkpointed and resumed
+    checkpoint_filepath = None
+    if (checkpoint or resume) and misc_fns.STDIO_PATH not in (source_filepath, target_filepath):
+        checkpoint_filepath = misc_fns.get_sidecar_filepath(target_filepath, CHECKPOINT_SUFFIX)
+    source_row_hashes = None
+    if previous_filepath:
+        result_data, source_row_hashes = build_entries_incremental(source_filepath, previous_filepath, tsv_headers, url_map,
+                                                                   name_space_map, chunk, log, metadata, checkpoint_filepath, resume)
+    else:
+        # the row hashes are computed while the entries are built, without a second pass over the source
+        source_row_hashes = {} if row_hashes else None
+        result_data = build_entries(source_filepath, tsv_headers, url_map, name_space_map, chunk, log, metadata,
+                                    checkpoint_filepath = checkpoint_filepath, resume = resume, row_hashes = source_row_hashes)
+    if validator is not None:
+        with metrics.stage('validation'):
+            validate_entries(result_data, validator, target_filepath)
+    with metrics.stage('serialization'):
+        misc_fns.write_entries(target_filepath, result_data, compact, jsonl)
+    write_row_hashes(target_filepath, metadata, source_row_hashes)
+    if checkpoint_filepath and os.path.isfile(checkpoint_filepath):
+        os.remove(checkpoint_filepath)
+
+def build_entries(source_filepath: str, tsv_headers: list, url_map: dict, name_space_map: dict, chunk: int = 10_000, log: bool = False, metadata: bool = True, biomarker_ids: set = None, checkpoint_filepath: str = None, resume: bool = False, row_hashes: dict = None) -> list:
+    ''' Builds the JSON data model entries from the TSV rows. The rows of a biomarker can be spread 
+    across the file, so the entries are only final once the whole file has been read.
+
+    If a checkpoint filepath is passed, a checkpoint is appended to it every `chunk` rows with the 
+    number of rows processed and the entries added or updated since the previous checkpoint, so 
+    writing a checkpoint doesn't get slower as the results grow. The API responses are already 
+    written to the mapping data caches as they are retrieved. With `resume` the entries and the 
+    row offset are restored from the last complete checkpoint and the conversion continues from 
+    there (the citation data is added once all the rows are processed, from the cache where 
+    available).
+
+    The time spent parsing the rows, building and merging the entries, looking up the metadata and 
+    adding the citations is recorded in the run metrics, and with `log` a progress message with the 
+    throughput (and the ETA, if the rows of the source file can be counted) is printed every 
+    `chunk` rows.
+
+    Parameters
+    ----------
+    source_filepath : str
+        Filepath to the source TSV file.
     tsv_headers : list
         List of the headers in the TSV file.
     url_map : dict
@@ -29,9 +115,29 @@ def tsv_to_json(source_filepath: str, target_filepath: str, tsv_headers: list, u
         Whether to print a message when the log checkpoint is hit.
     metadata : bool (default: True)
          Whether to attempt automatic metadata retrieval.
+    biomarker_ids : set (default: None)
+        If passed, only the rows of these biomarker IDs are built.
+    checkpoint_filepath : str (default: None)
+        If passed, the filepath to write the checkpoints to.
+    resume : bool (default: False)
+        Whether to resume from the checkpoint in the checkpoint filepath.
+    row_hashes : dict (default: None)
+        If passed, the row group hashes of the whole source file (see hash_row_groups) are added to it 
+        while the rows are read.
+
+    Raises
+    ------
+    ValueError
+        If the checkpoint to resume from was written for a different source file or options.
+
+    Returns
+    -------
+    list
+        The finalized entries.
     '''
 
-    f = open(source_filepath, 'r')
+    total_rows = count_rows(source_filepath) if log else None
+    f = misc_fns.open_text(source_filepath, 'r')
     data = csv.DictReader(f, delimiter = '\t', quotechar = '"')
     for header in data.fieldnames:
         if header not in tsv_headers:
@@ -42,14 +148,47 @@ def tsv_to_json(source_filepath: str, target_filepath: str, tsv_headers: list, u
     biomarker_id_map: dict = {}
     curr_id_idx = 0
 
-    for row_idx, row in enumerate(data):
+    # indexes of the entries added or updated since the last checkpoint
+    checkpoint_file = None
+    updated_entries: set = set()
+    start_row = 0
+    if checkpoint_filepath:
+        header = get_checkpoint_header(source_filepath, metadata, biomarker_ids)
+        if resume and os.path.isfile(checkpoint_filepath):
+            start_row, result_data = load_checkpoint(checkpoint_filepath, header)
+            biomarker_id_map = {entry['biomarker_id']: entry_idx for entry_idx, entry in enumerate(result_data)}
+            curr_id_idx = len(result_data)
+            misc_fns.print_and_log(f'Resuming from the checkpoint at row {start_row} ({len(result_data)} entries).', 'warning')
+            checkpoint_file = misc_fns.open_binary(checkpoint_filepath, 'a')
+        else:
+            if resume:
+                misc_fns.print_and_log(f'No checkpoint found at {checkpoint_filepath}, starting from the beginning.', 'warning')
+            checkpoint_file = misc_fns.open_binary(checkpoint_filepath, 'w')
+            checkpoint_file.write(misc_fns.dumps_json(header, compact = True) + b'\n')
+
+    for row_idx, row in enumerate(metrics.timed_iter(data, 'tsv_parse')):
+
+        # hashed before any row is skipped, the hashes cover the rows restored from a checkpoint too
+        if row_hashes is not None:
+            update_row_hash(row_hashes, row)
+        if row_idx < start_row:
+            continue
+        if checkpoint_file is not None and row_idx > start_row and row_idx % chunk == 0:
+            with metrics.stage('checkpoint'):
+                write_checkpoint(checkpoint_file, result_data, updated_entries, row_idx)
+            updated_entries = set()
 
         if (row_idx + 1) % chunk == 0:
             if log:
-                misc_fns.print_and_log(f'Log checkpoint at row {row_idx}...', 'info')
-                print(f'Log checkpoint hit at row {row_idx}...')
+                progress = metrics.progress_message(row_idx + 1, total_rows, start_row)
+                misc_fns.print_and_log(progress, 'info')
+                print(progress)
 
+        metrics.increment('rows')
         row = {key: value.strip() if isinstance(value, str) else value for key, value in row.items()}
+        if biomarker_ids is not None and row['biomarker_id'] not in biomarker_ids:
+            continue
+        metrics.start_stage('row_build')
 
         # object/array dictionary for object field tags
         component_object_evidence_fields = {
@@ -65,7 +204,8 @@ def tsv_to_json(source_filepath: str, target_filepath: str, tsv_headers: list, u
         ### build biomarker component object
         api_counts, base_biomarker_component_object = utils.build_base_biomarker_component_entry(row, name_space_map, metadata)
         if metadata:
-            syn_utils.handle_rate_limits(api_counts)
+            with metrics.stage('rate_limit_wait'):
+                syn_utils.handle_rate_limits(api_counts)
 
         ### build and add the spcimen entry to the biomarker component object
         biomarker_component = utils.add_specimen_entry(row, base_biomarker_component_object, url_map)
@@ -78,14 +218,17 @@ def tsv_to_json(source_filepath: str, target_filepath: str, tsv_headers: list, u
 
         ### build top level entry
         biomarker_entry = utils.build_biomarker_entry(row, biomarker_component, condition_entry, top_evidence_source)
+        metrics.stop_stage()
 
         ### check if the biomarker entry should be added to the result data or if it already exists
         ### if it already exists, the existing component will be updated
+        metrics.start_stage('merge')
 
         # entry does not exist, add to the result data
         if row['biomarker_id'] not in biomarker_id_map.keys():
             # add to id map and increment index 
             biomarker_id_map[row['biomarker_id']] = curr_id_idx
+            updated_entries.add(curr_id_idx)
             curr_id_idx += 1 
             # add entry to the result data
             result_data.append(biomarker_entry)
@@ -94,6 +237,7 @@ def tsv_to_json(source_filepath: str, target_filepath: str, tsv_headers: list, u
         else:
             existing_entry_index = biomarker_id_map[row['biomarker_id']]
             existing_entry = result_data[existing_entry_index]
+            updated_entries.add(existing_entry_index)
             
             # find the component element that matches the current component object
             component_to_update_idx = -1 
@@ -183,14 +327,327 @@ def tsv_to_json(source_filepath: str, target_filepath: str, tsv_headers: list, u
                             existing_top_evidence['tags'].append({'tag': tag})
                 if add_top_evidence:
                     result_data[existing_entry_index]['evidence_source'].append(top_evidence_source[0])
+        metrics.stop_stage()
     
     total_api_calls = syn_utils.get_total_api_calls()
     for resource, count in total_api_calls.items():
         misc_fns.print_and_log(f'Total {resource} API calls: {count}', 'info')
     
+    if checkpoint_file is not None:
+        checkpoint_file.close()
+
     if ADD_CITATION_DATA:
-        result_data = utils.add_citation_data(result_data)
-    
-    misc_fns.write_json(target_filepath, result_data)
+        with metrics.stage('citation_enrichment'):
+            result_data = utils.add_citation_data(result_data)
+    metrics.increment('entries', len(result_data))
+    if row_hashes is not None:
+        for biomarker_id, row_hash in row_hashes.items():
+            row_hashes[biomarker_id] = row_hash.hexdigest()
 
     f.close()
+
+    return result_data
+
+def build_entries_incremental(source_filepath: str, previous_filepath: str, tsv_headers: list, url_map: dict, name_space_map: dict, chunk: int = 10_000, log: bool = False, metadata: bool = True, checkpoint_filepath: str = None, resume: bool = False) -> tuple:
+    ''' Builds the entries incrementally against the previous JSON output. The TSV rows are hashed per 
+    biomarker ID and compared with the row hashes stored by the previous rebuild, only the entries 
+    whose rows changed (or are new) are rebuilt (and re-enriched), the unchanged entries are reused 
+    verbatim from the previous output, including their citations. Entries whose biomarker ID is no 
+    longer in the TSV are dropped.
+
+    If the previous output has no stored row hashes, they were built with a different metadata 
+    setting, or they no longer describe the previous output (its size or modification time changed 
+    since they were written, see write_row_hashes), all the entries are rebuilt. After changing the conversion code or the maps, do a full 
+    conversion without the previous output.
+
+    Parameters
+    ----------
+    source_filepath : str
+        Filepath to the source TSV file.
+    previous_filepath : str
+        Filepath to the previous JSON output.
+    tsv_headers : list
+        List of the headers in the TSV file.
+    url_map : dict
+        Dictionary that provides mappings for name space's to base URL's. This assists with URL construction.
+    name_space_map : dict
+        Dictionary that provides mappings for name space acronym's to full name space names.
+    chunk : int (default: 10,000)
+        Log checkpoint.
+    log : bool (default: False)
+        Whether to print a message when the log checkpoint is hit.
+    metadata : bool (default: True)
+         Whether to attempt automatic metadata retrieval.
+    checkpoint_filepath : str (default: None)
+        If passed, the filepath to write the checkpoints of the rebuild to.
+    resume : bool (default: False)
+        Whether to resume the rebuild from the checkpoint in the checkpoint filepath.
+
+    Returns
+    -------
+    tuple
+        The finalized entries, in the order the biomarker IDs first appear in the TSV, and the row hashes 
+        of the source file.
+    '''
+    with metrics.stage('row_hashing'):
+        row_hashes = hash_row_groups(source_filepath)
+
+    previous_hashes = {}
+    previous_hashes_filepath = misc_fns.get_sidecar_filepath(previous_filepath, ROW_HASHES_SUFFIX)
+    try:
+        previous_manifest = misc_fns.load_json(previous_hashes_filepath)
+    except FileNotFoundError:
+        misc_fns.print_and_log(f'No row hashes found for the previous output ({previous_hashes_filepath}), rebuilding all entries.', 'warning')
+    else:
+        if previous_manifest.get('target') != get_file_fingerprint(previous_filepath):
+            misc_fns.print_and_log(f'The row hashes {previous_hashes_filepath} don\'t match the previous output (it was modified since they were written), rebuilding all entries.', 'warning')
+        elif previous_manifest.get('metadata') != metadata:
+            misc_fns.print_and_log('The previous output was built with a different metadata setting, rebuilding all entries.', 'warning')
+        else:
+            previous_hashes = previous_manifest['row_hashes']
+
+    unchanged_ids = {biomarker_id for biomarker_id, row_hash in row_hashes.items() if previous_hashes.get(biomarker_id) == row_hash}
+    previous_entries = {}
+    if unchanged_ids:
+        with metrics.stage('previous_load'):
+            for entry in misc_fns.stream_json(previous_filepath):
+                if entry['biomarker_id'] in unchanged_ids:
+                    previous_entries[entry['biomarker_id']] = entry
+    changed_ids = set(row_hashes) - set(previous_entries)
+
+    removed_count = sum(1 for biomarker_id in previous_hashes if biomarker_id not in row_hashes)
+    misc_fns.print_and_log(f'Incremental rebuild: rebuilding {len(changed_ids)} of {len(row_hashes)} entries, reusing {len(previous_entries)}, removing {removed_count}.', 'info')
+    print(f'Incremental rebuild: rebuilding {len(changed_ids)} of {len(row_hashes)} entries, reusing {len(previous_entries)}, removing {removed_count}.')
+
+    rebuilt_entries = {}
+    if changed_ids:
+        for entry in build_entries(source_filepath, tsv_headers, url_map, name_space_map, chunk, log, metadata, changed_ids,
+                                   checkpoint_filepath, resume):
+            rebuilt_entries[entry['biomarker_id']] = entry
+
+    entries = [rebuilt_entries[biomarker_id] if biomarker_id in rebuilt_entries else previous_entries[biomarker_id] for biomarker_id in row_hashes]
+    return entries, row_hashes
+
+def write_row_hashes(target_filepath: str, metadata: bool, row_hashes: dict = None) -> None:
+    ''' Writes the row hashes of the source file next to a JSON output that was just written, so it 
+    can be used as the previous output of an incremental rebuild. The row hashes are stored with the 
+    metadata setting and the fingerprint of the output (see get_file_fingerprint), so they are not 
+    trusted once the output is overwritten or modified. If no row hashes are passed, any existing row 
+    hashes of the output are removed instead.
+
+    Parameters
+    ----------
+    target_filepath : str
+        Filepath to the JSON (or JSON Lines) output.
+    metadata : bool
+        Whether automatic metadata retrieval was attempted.
+    row_hashes : dict (default: None)
+        The row hashes of the source file (see hash_row_groups).
+    '''
+    if target_filepath == misc_fns.STDIO_PATH:
+        return
+    row_hashes_filepath = misc_fns.get_sidecar_filepath(target_filepath, ROW_HASHES_SUFFIX)
+    if row_hashes is None:
+        if os.path.isfile(row_hashes_filepath):
+            os.remove(row_hashes_filepath)
+        return
+    misc_fns.write_json(row_hashes_filepath, {'metadata': metadata, 'target': get_file_fingerprint(target_filepath), 'row_hashes': row_hashes})
+
+def get_file_fingerprint(filepath: str) -> dict:
+    ''' Gets the fingerprint of a file, its size and modification time.
+
+    Parameters
+    ----------
+    filepath : str
+        The filepath.
+
+    Returns
+    -------
+    dict
+        The file fingerprint.
+    '''
+    file_stat = os.stat(filepath)
+    return {'size': file_stat.st_size, 'mtime': file_stat.st_mtime_ns}
+
+def hash_row_groups(source_filepath: str) -> dict:
+    ''' Hashes the TSV rows of each biomarker ID (in file order, the rows of a biomarker can be 
+    spread across the file).
+
+    Parameters
+    ----------
+    source_filepath : str
+        Filepath to the source TSV file.
+
+    Returns
+    -------
+    dict
+        The row group hash per biomarker ID, in the order the biomarker IDs first appear.
+    '''
+    hashes: dict = {}
+    with misc_fns.open_text(source_filepath, 'r') as f:
+        data = csv.DictReader(f, delimiter = '\t', quotechar = '"')
+        for row in data:
+            update_row_hash(hashes, row)
+    return {biomarker_id: row_hash.hexdigest() for biomarker_id, row_hash in hashes.items()}
+
+def update_row_hash(hashes: dict, row: dict) -> None:
+    ''' Adds a TSV row to the hash of its biomarker ID.
+
+    Parameters
+    ----------
+    hashes : dict
+        The hash objects per biomarker ID.
+    row : dict
+        The TSV row.
+    '''
+    row = {key: value.strip() if isinstance(value, str) else value for key, value in row.items()}
+    if row['biomarker_id'] not in hashes:
+        hashes[row['biomarker_id']] = hashlib.sha256()
+    # serialized with the stdlib json module, so the hashes don't depend on the JSON backend
+    hashes[row['biomarker_id']].update(json.dumps(row, sort_keys = True, separators = (',', ':')).encode('utf-8') + b'\n')
+
+def count_rows(source_filepath: str) -> Optional[int]:
+    ''' Counts the data rows of the source TSV file from its line breaks, for the progress ETA. Only 
+    uncompressed regular files are counted, a stream or compressed file can't be cheaply read twice.
+
+    Parameters
+    ----------
+    source_filepath : str
+        Filepath to the source TSV file.
+
+    Returns
+    -------
+    int or None
+        The number of data rows (approximate if fields contain line breaks), None if not counted.
+    '''
+    if source_filepath == misc_fns.STDIO_PATH or misc_fns.strip_compression_extension(source_filepath) != source_filepath:
+        return None
+    line_count = 0
+    with open(source_filepath, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            line_count += block.count(b'\n')
+    return max(line_count - 1, 0)
+
+def get_checkpoint_header(source_filepath: str, metadata: bool, biomarker_ids: set = None) -> dict:
+    ''' Gets the header of a checkpoint, which identifies the source file and the options the 
+    checkpoint was written with so it isn't resumed for a different conversion.
+
+    Parameters
+    ----------
+    source_filepath : str
+        Filepath to the source TSV file.
+    metadata : bool
+        Whether automatic metadata retrieval is attempted.
+    biomarker_ids : set (default: None)
+        The biomarker IDs that are built, if only a subset is built.
+
+    Returns
+    -------
+    dict
+        The checkpoint header.
+    '''
+    source_stat = os.stat(source_filepath)
+    return {
+        'source': os.path.abspath(source_filepath),
+        'source_size': source_stat.st_size,
+        'source_mtime': source_stat.st_mtime_ns,
+        'metadata': metadata,
+        'biomarker_ids': None if biomarker_ids is None else hashlib.sha256('\n'.join(sorted(biomarker_ids)).encode('utf-8')).hexdigest()
+    }
+
+def write_checkpoint(checkpoint_file, result_data: list, updated_entries: set, row_count: int) -> None:
+    ''' Appends a checkpoint, the entries updated since the last checkpoint followed by the number of 
+    rows processed. The row count line marks the checkpoint as complete.
+
+    Parameters
+    ----------
+    checkpoint_file : IO[bytes]
+        The open checkpoint file.
+    result_data : list
+        The entries built so far.
+    updated_entries : set
+        Indexes of the entries added or updated since the last checkpoint.
+    row_count : int
+        Number of rows processed.
+    '''
+    for entry_idx in sorted(updated_entries):
+        checkpoint_file.write(misc_fns.dumps_json({'index': entry_idx, 'entry': result_data[entry_idx]}, compact = True) + b'\n')
+    checkpoint_file.write(misc_fns.dumps_json({'rows': row_count}, compact = True) + b'\n')
+    checkpoint_file.flush()
+    os.fsync(checkpoint_file.fileno())
+    misc_fns.print_and_log(f'Checkpoint written at row {row_count}.', 'info')
+
+def load_checkpoint(checkpoint_filepath: str, header: dict) -> tuple:
+    ''' Loads the entries and the row offset of the last complete checkpoint. Any incomplete 
+    checkpoint after it (e.g. from a crash while it was written) is truncated from the file.
+
+    Parameters
+    ----------
+    checkpoint_filepath : str
+        Filepath to the checkpoint file.
+    header : dict
+        The expected checkpoint header.
+
+    Raises
+    ------
+    ValueError
+        If the checkpoint was written for a different source file or options.
+
+    Returns
+    -------
+    tuple
+        The number of rows processed and the entries built.
+    '''
+    entries: dict = {}
+    pending: dict = {}
+    row_count = 0
+    complete_offset = 0
+    with misc_fns.open_binary(checkpoint_filepath) as f:
+        first_line = f.readline()
+        try:
+            checkpoint_header = misc_fns.loads_json(first_line)
+        except ValueError:
+            checkpoint_header = None
+        if checkpoint_header != header:
+            misc_fns.print_and_log(f'Error: The checkpoint {checkpoint_filepath} was written for a different source file or options, remove it to start over.', 'error')
+            raise ValueError(f'Error: The checkpoint {checkpoint_filepath} was written for a different source file or options, remove it to start over.')
+        offset = complete_offset = len(first_line)
+        for line in f:
+            offset += len(line)
+            if not line.endswith(b'\n'):
+                break
+            try:
+                record = misc_fns.loads_json(line)
+            except ValueError:
+                break
+            if 'rows' in record:
+                entries.update(pending)
+                pending = {}
+                row_count = record['rows']
+                complete_offset = offset
+            else:
+                pending[record['index']] = record['entry']
+    with open(checkpoint_filepath, 'r+b') as f:
+        f.truncate(complete_offset)
+    return row_count, [entries[entry_idx] for entry_idx in range(len(entries))]
+
+def validate_entries(entries: list, validator: 'Validator', target_filepath: str) -> None:
+    ''' Validates the finalized entries against the item schema and writes the failures to a side 
+    report next to the target file.
+
+    Parameters
+    ----------
+    entries : list
+        The finalized entries.
+    validator : Validator
+        The compiled entry validator.
+    target_filepath : str
+        Filepath of the target file the report is written next to.
+    '''
+    from fmt_lib import schema_validation as schema_val
+    failures = []
+    for entry_idx, entry in enumerate(entries):
+        errors = schema_val.validate_entry(entry, validator)
+        if errors:
+            failures.append({'index': entry_idx, 'biomarker_id': entry.get('biomarker_id'), 'errors': errors})
+    schema_val.write_report(schema_val.get_report_filepath(target_filepath), failures, len(entries))
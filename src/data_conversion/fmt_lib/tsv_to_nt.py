@@ -0,0 +1,82 @@
+''' Handles the fused TSV -> NT/TTL conversion. The entries built from the TSV rows are passed 
+straight to the triple builders, so the graph export only reads the source once and doesn't 
+have to write and re-read the full JSON. The JSON can optionally be written along the way.
+'''
+
+import os
+from fmt_lib import misc_functions as misc_fns
+from fmt_lib import tsv_to_json as t_to_j
+from fmt_lib import json_to_nt as j_to_nt
+from fmt_lib import metrics
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from jsonschema.protocols import Validator
+
+def tsv_to_nt(source_filepath: str, target_filepath: str, tsv_headers: list, url_map: dict, name_space_map: dict, triples_map: dict, chunk: int = 10_000, log: bool = False, metadata: bool = True, workers: int = 1, dedup: bool = False, turtle: bool = None, json_filepath: str = None, validator: 'Validator' = None, compact: bool = False, checkpoint: bool = False, resume: bool = False, row_hashes: bool = False) -> None:
+    ''' Entry point for the TSV -> NT/TTL conversion.
+
+    Parameters
+    ----------
+    source_filepath : str
+        Filepath to the source TSV file.
+    target_filepath : str
+        Filepath to the target NT or TTL file to generate.
+    tsv_headers : list
+        List of the headers in the TSV file.
+    url_map : dict
+        Dictionary that provides mappings for name space's to base URL's. This assists with URL construction.
+    name_space_map : dict
+        Dictionary that provides mappings for name space acronym's to full name space names.
+    triples_map : dict
+        The triples map to use for the conversion.
+    chunk : int (default: 10,000)
+        Log and checkpoint interval (see tsv_to_json.build_entries).
+    log : bool (default: False)
+        Whether to print a message when the log checkpoint is hit.
+    metadata : bool (default: True)
+         Whether to attempt automatic metadata retrieval.
+    workers : int (default: 1)
+        Number of worker processes to build the triples with.
+    dedup : bool (default: False)
+        Whether to remove duplicate triples across the whole dataset.
+    turtle : bool (default: None)
+        Whether to write Turtle, if not passed it is determined by the target filepath.
+    json_filepath : str (default: None)
+        If passed, the entries are also written to this JSON (or JSON Lines) file.
+    validator : Validator (default: None)
+        If passed, each finalized entry is validated against the item schema and the failures are 
+        written to a side report next to the JSON file (or the target file if no JSON is written).
+    compact : bool (default: False)
+        Whether to write compact instead of indented JSON (ignored for JSON Lines files).
+    checkpoint : bool (default: False)
+        Whether to write a checkpoint next to the target file every `chunk` rows so an interrupted 
+        conversion can be resumed.
+    resume : bool (default: False)
+        Whether to resume from the checkpoint left next to the target file by an interrupted conversion, 
+        implies `checkpoint`.
+    row_hashes : bool (default: False)
+        Whether to write the row hashes of the source file next to the JSON file, so it can be the previous 
+        output of an incremental rebuild (see tsv_to_json.write_row_hashes).
+    '''
+    # checkpoints are written next to the target file, a stream can't be checkpointed and resumed
+    checkpoint_filepath = None
+    if (checkpoint or resume) and misc_fns.STDIO_PATH not in (source_filepath, target_filepath):
+        checkpoint_filepath = misc_fns.get_sidecar_filepath(target_filepath, t_to_j.CHECKPOINT_SUFFIX)
+    source_row_hashes = {} if row_hashes and json_filepath else None
+    entries = t_to_j.build_entries(source_filepath, tsv_headers, url_map, name_space_map, chunk, log, metadata,
+                                   checkpoint_filepath = checkpoint_filepath, resume = resume, row_hashes = source_row_hashes)
+    if validator is not None:
+        with metrics.stage('validation'):
+            t_to_j.validate_entries(entries, validator, json_filepath or target_filepath)
+    if json_filepath:
+        with metrics.stage('json_serialization'):
+            misc_fns.write_entries(json_filepath, entries, compact)
+        t_to_j.write_row_hashes(json_filepath, metadata, source_row_hashes)
+    if turtle is None:
+        turtle = misc_fns.strip_compression_extension(target_filepath).endswith(j_to_nt.TURTLE_EXTENSION)
+    with metrics.stage('serialization'):
+        j_to_nt.entries_to_nt(entries, target_filepath, triples_map, name_space_map, workers, dedup, turtle)
+    if checkpoint_filepath and os.path.isfile(checkpoint_filepath):
+        os.remove(checkpoint_filepath)
+    misc_fns.print_and_log(f'Conversion complete. {"TTL" if turtle else "NT"} file written to {target_filepath}', 'info')
@@ -7,6 +7,11 @@ Currently configured to test these scripts:
     - /schema/validate_data.py
     - /src/table_json_conversion.py 
 
+Along with the assertion file tests, the validation backends are checked to agree with each other and 
+the TSV conversions are checked to give the same output when built incrementally, resumed after an 
+interruption, or fused with the NT conversion, and the orjson and json serializer backends are checked 
+to write the same compact JSON.
+
 Usage: python test.py [options]
 
     Optional arguments:
@@ -19,6 +24,8 @@ import argparse
 import sys 
 import os 
 import subprocess
+import tempfile
+import contextlib
 import glob 
 import logging
 import pandas as pd
@@ -29,6 +36,25 @@ _log_path = None
 _python = None
 _tmp_output_path = None 
 SOURCE_FILES = None 
+# extra data_conversion.py arguments for the data conversion test cases whose name contains the key
+CONVERSION_TEST_ARGS = {'_dedup_': ['-d']}
+# validate_data.py arguments of the backend configurations that have to agree with the default backend
+VALIDATOR_CONFIGURATIONS = {
+    'worker pool': ['-w', '2'],
+    'fast backend': ['-b', 'fast'],
+    'incremental': ['-i'],
+    'incremental (stored results)': ['-i'],
+    'fast backend incremental': ['-b', 'fast', '-i']
+}
+# data conversion test cases with placeholder entity IDs (without a namespace), which can only be 
+# converted from JSON to TSV and are left out of the conversion regression tests
+JSON_TO_TSV_ONLY_TEST_CASES = ('single_entry_multiple_components_tsv', 'single_entry_variable_tsv', 'single_entry_variable_complex_tsv')
+# extra JSON backend test cases, with values orjson writes differently from the stdlib json module (it 
+# writes the non-finite floats as null)
+JSON_BACKEND_TEST_CASES = {
+    'non_finite_floats': [{'biomarker_id': 'AN0001', 'score': float('nan'), 'range': [float('-inf'), float('inf')], 'note': None}],
+    'null_values': [{'biomarker_id': 'AN0002', 'score': 0.5, 'note': None}]
+}
 
 def user_args() -> None:
     ''' Parses the command line arguments.
@@ -170,6 +196,14 @@ def validate_assertion(source_filepath: str, assertion_filepath: str, filetype:
             return True
         else:
             return False
+    
+    # checks the assertion if the target conversion format is nt or ttl, the triples are written in a deterministic order
+    elif filetype.lower().strip() in ('nt', 'ttl'):
+        with open(source_filepath, 'r') as f:
+            source_data = f.read()
+        with open(assertion_filepath, 'r') as f:
+            assertion_data = f.read()
+        return source_data == assertion_data
 
 # def validate_conversion_assertion(source_filepath: str, assertion_filepath: str, source_filetype: str) -> bool:
 #     ''' Validates a generated file against the corresponding assertion file.
@@ -326,6 +360,42 @@ def validate_data_tests(test_data: dict) -> str:
     result += f'\n\tOVERVIEW: Total validate_data tests failed --> {fail_count}'
     return result
 
+def validator_agreement_tests(test_data: dict) -> str:
+    ''' Checks that the validate_data.py backend configurations (see VALIDATOR_CONFIGURATIONS) give the 
+    same result as the default jsonschema backend for each schema test case.
+
+    Parameters
+    ----------
+    test_data: dict
+        The data for the data validation testing.
+
+    Returns
+    -------
+    str
+        The output string for the test case results.
+    '''
+    script = os.path.split(test_data['script_path'])[1]
+    test_files = [f"{test_tmp.replace('./', '../supplementary_files/tests/')}" for test_tmp in test_data['data_files']]
+    cwd = '../../schema'
+    result = 'DATA VALIDATION BACKEND AGREEMENT RESULTS:'
+    fail_count = 0
+    test_num = 0
+
+    for test in test_files:
+        test_name = os.path.split(os.path.splitext(test)[0])[1]
+        args = [test, f'v{_version}/biomarker_schema.json']
+        # the summary line printed by the default backend is the expected result
+        expected = subprocess.run([_python, script] + args, cwd = cwd, capture_output = True, text = True).stdout.strip()
+        for configuration, configuration_args in VALIDATOR_CONFIGURATIONS.items():
+            output = subprocess.run([_python, script] + configuration_args + args, cwd = cwd, capture_output = True, text = True)
+            test_result = bool(expected) and output.stdout.strip() == expected
+            if not test_result: fail_count += 1
+            test_num += 1
+            result += f"\n\tTEST #{test_num}: {test_name} ({configuration})...RESULT: {'passed' if test_result else 'FAILED'}"
+
+    result += f'\n\tOVERVIEW: Total validator agreement tests failed --> {fail_count}'
+    return result
+
 def data_conversion_tests(test_data: dict) -> str:
     ''' Runs the tests for the data_conversion.py script.
     
@@ -352,25 +422,31 @@ def data_conversion_tests(test_data: dict) -> str:
     loop_tests = []
 
     # run each test
-    for test_num, test in enumerate(test_files):
+    for test in test_files:
         test_name = os.path.split(os.path.splitext(test)[0])[1]
-        target_file_format = os.path.splitext(test)[0].split('_')[-1]
-        if target_file_format == 'loop':
+        if test_name.split('_')[-1] == 'loop':
             loop_tests.append(test)
             continue
-        test_file_format = os.path.splitext(test)[1]
-        generated_file = f'{_tmp_output_path}data_conversion_test.{target_file_format}'
-        args = [test, generated_file]
-        # run the script 
-        _ = subprocess.run([venv_python, script] + args, cwd = cwd, capture_output = True, text = True)
-        # check the result
-        correspdonding_assertion = assertion_files[assertion_files.index(f"{test.replace('test_data', 'assertion_files').replace('../../supplementary_files/tests/', './').replace(f'{test_file_format}', f'.{target_file_format}')}")]
-        test_result = validate_assertion(f"{generated_file.replace('./', '../../src/data_conversion/')}", correspdonding_assertion, target_file_format)
-        # remove the generated file
-        os.remove(generated_file.replace('./', '../../src/data_conversion/'))
-        if not test_result: fail_count += 1
-        result += f"\n\tTEST #{test_num + 1}: {test_name}...RESULT: {'passed' if test_result else 'FAILED'}"
-        overall_count += 1
+        # the test data is converted to the format of each of its assertion files
+        test_assertions = sorted(assertion for assertion in assertion_files if os.path.split(os.path.splitext(assertion)[0])[1] == test_name)
+        for correspdonding_assertion in test_assertions:
+            target_file_format = os.path.splitext(correspdonding_assertion)[1].replace('.', '')
+            generated_file = f'{_tmp_output_path}data_conversion_test.{target_file_format}'
+            args = [test, generated_file]
+            for name_key, extra_args in CONVERSION_TEST_ARGS.items():
+                if name_key in test_name:
+                    args += extra_args
+            # run the script 
+            _ = subprocess.run([venv_python, script] + args, cwd = cwd, capture_output = True, text = True)
+            # check the result, a conversion that didn't write the generated file failed
+            local_generated_file = generated_file.replace('./', '../../src/data_conversion/')
+            test_result = os.path.isfile(local_generated_file) and validate_assertion(local_generated_file, correspdonding_assertion, target_file_format)
+            # remove the generated file
+            if os.path.isfile(local_generated_file):
+                os.remove(local_generated_file)
+            if not test_result: fail_count += 1
+            overall_count += 1
+            result += f"\n\tTEST #{overall_count}: {test_name} ({target_file_format})...RESULT: {'passed' if test_result else 'FAILED'}"
     
     # run loop tests
     for test in loop_tests:
@@ -384,13 +460,18 @@ def data_conversion_tests(test_data: dict) -> str:
         args = [[test, generated_files[0]]] + [[generated_files[i-1], generated_files[i]] for i in range(1, len(generated_files))]
         for arg in args:
             _ = subprocess.run([venv_python, script] + arg, cwd = cwd, capture_output = True, text = True)
-        # check the results 
-        test_result_1 = validate_assertion(f"{generated_files[0].replace('./', '../../src/data_conversion/')}", f"{generated_files[2].replace('./', '../../src/data_conversion/')}", target_file_formats[0])
-        test_result_2 = validate_assertion(f"{test.replace('../../supplementary_files/tests/v{_version}/data_conversion/', './')}", f"{generated_files[1].replace('./', '../../src/data_conversion/')}", target_file_formats[1])
-        test_result = True if test_result_1 and test_result_2 else False
+        # check the results, a conversion that didn't write its generated file failed
+        local_generated_files = [generated_file.replace('./', '../../src/data_conversion/') for generated_file in generated_files]
+        if all(os.path.isfile(generated_file) for generated_file in local_generated_files):
+            test_result_1 = validate_assertion(local_generated_files[0], local_generated_files[2], target_file_formats[0])
+            test_result_2 = validate_assertion(f"{test.replace('../../supplementary_files/tests/v{_version}/data_conversion/', './')}", local_generated_files[1], target_file_formats[1])
+            test_result = True if test_result_1 and test_result_2 else False
+        else:
+            test_result = False
         # remove the generated files
-        for generated_file in generated_files:
-            os.remove(generated_file.replace('./', '../../src/data_conversion/'))
+        for generated_file in local_generated_files:
+            if os.path.isfile(generated_file):
+                os.remove(generated_file)
         if not test_result: fail_count += 1
         overall_count += 1
         result += f"\n\tTEST #{overall_count + 1}: {test_name}...RESULT: {'passed' if test_result else 'FAILED'}"
@@ -398,6 +479,171 @@ def data_conversion_tests(test_data: dict) -> str:
     result += f'\n\tOVERVIEW: Total data_conversion tests failed --> {fail_count}'
     return result
 
+def conversion_regression_tests(test_data: dict) -> str:
+    ''' Runs the regression tests for the TSV conversions of the data_conversion.py script. The TSV 
+    sources are generated from the data conversion test data (see JSON_TO_TSV_ONLY_TEST_CASES), and each 
+    test checks that a conversion gives the same output as the full TSV -> JSON (or JSON -> NT) conversion:
+        - incremental: rebuilt incrementally against a previous output with changed, new, and removed entries
+        - resume: resumed from the checkpoint of a conversion interrupted at the last row, only the last row is parsed again
+        - fused: the TSV -> NT conversion compared to the JSON -> NT conversion of the full output
+
+    The conversions run in process through the Converter API without metadata retrieval, and the 
+    mapping data caches are kept in a temporary directory so the repository caches aren't modified.
+
+    Parameters
+    ----------
+    test_data: dict
+        The data for the data conversion testing.
+
+    Returns
+    -------
+    str
+        The output string for the test case results.
+    '''
+    sys.path.insert(0, os.path.abspath(os.path.split(test_data['script_path'])[0]))
+    from fmt_lib.converter import Converter
+    from fmt_lib import tsv_to_json_utils
+
+    test_files = sorted(test for test in test_data['data_files'] if os.path.split(os.path.splitext(test)[0])[1] not in JSON_TO_TSV_ONLY_TEST_CASES)
+    result = 'DATA CONVERSION REGRESSION RESULTS:'
+    fail_count = 0
+    test_num = 0
+
+    with tempfile.TemporaryDirectory() as tmp_dir, open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        mapping_data_path = os.path.join(tmp_dir, 'mapping_data')
+        os.mkdir(mapping_data_path)
+        for cache_file in ('doid_map.json', 'pubmed_map.json'):
+            with open(os.path.join(mapping_data_path, cache_file), 'w') as f:
+                json.dump({}, f)
+        converter = Converter(mapping_data_path = mapping_data_path)
+
+        for test in test_files:
+            test_name = os.path.split(os.path.splitext(test)[0])[1]
+            paths = {name: os.path.join(tmp_dir, f'{test_name}_{name}') for name in ('source.tsv', 'previous.tsv', 'full.json', 'previous.json',
+                                                                                      'incremental.json', 'resumed.json', 'full.nt', 'fused.nt')}
+            test_results = {}
+            try:
+                converter.convert(test, paths['source.tsv'])
+                converter.convert(paths['source.tsv'], paths['full.json'], metadata = False)
+                with open(paths['full.json'], 'r') as f:
+                    full_data = json.load(f)
+
+                # the previous release is written with its row hashes so the rebuild only converts the changed entries
+                write_previous_tsv(paths['source.tsv'], paths['previous.tsv'])
+                converter.convert(paths['previous.tsv'], paths['previous.json'], metadata = False, row_hashes = True)
+                converter.convert(paths['source.tsv'], paths['incremental.json'], metadata = False, previous_filepath = paths['previous.json'])
+                # the row hashes are only written on request or by an incremental rebuild
+                row_hashes_written = [os.path.isfile(f'{os.path.splitext(paths[name])[0]}_row_hashes.json') for name in ('full.json', 'previous.json', 'incremental.json')]
+                with open(paths['incremental.json'], 'r') as f:
+                    test_results['incremental'] = row_hashes_written == [False, True, True] and json.load(f) == full_data
+
+                # interrupt the conversion when the last row is parsed, every row before it is checkpointed 
+                # so the resumed conversion only parses the last row again
+                with open(paths['source.tsv'], 'r') as f:
+                    row_count = sum(1 for _ in f) - 1
+                parse_tags = tsv_to_json_utils.parse_tags
+                parsed_rows = []
+                interrupt = True
+                def counted_parse_tags(*args, **kwargs):
+                    parsed_rows.append(args)
+                    if interrupt and len(parsed_rows) == row_count:
+                        raise KeyboardInterrupt('Simulated interruption.')
+                    return parse_tags(*args, **kwargs)
+                tsv_to_json_utils.parse_tags = counted_parse_tags
+                try:
+                    try:
+                        converter.convert(paths['source.tsv'], paths['resumed.json'], chunk = 1, metadata = False, checkpoint = True)
+                    except KeyboardInterrupt:
+                        pass
+                    interrupted = not os.path.isfile(paths['resumed.json'])
+                    interrupt = False
+                    parsed_rows.clear()
+                    converter.convert(paths['source.tsv'], paths['resumed.json'], chunk = 1, metadata = False, resume = True)
+                finally:
+                    tsv_to_json_utils.parse_tags = parse_tags
+                with open(paths['resumed.json'], 'r') as f:
+                    test_results['resume'] = interrupted and len(parsed_rows) == 1 and json.load(f) == full_data
+
+                converter.convert(paths['full.json'], paths['full.nt'])
+                converter.convert(paths['source.tsv'], paths['fused.nt'], metadata = False)
+                test_results['fused'] = validate_assertion(paths['fused.nt'], paths['full.nt'], 'nt')
+            except Exception as e:
+                logging.error(f'Conversion regression test {test_name} failed with {type(e).__name__}: {e}')
+            for check in ('incremental', 'resume', 'fused'):
+                test_result = test_results.get(check, False)
+                if not test_result: fail_count += 1
+                test_num += 1
+                result += f"\n\tTEST #{test_num}: {test_name} ({check})...RESULT: {'passed' if test_result else 'FAILED'}"
+
+    result += f'\n\tOVERVIEW: Total data_conversion regression tests failed --> {fail_count}'
+    return result
+
+def json_backend_tests(test_data: dict) -> str:
+    ''' Checks that the orjson and stdlib json serializer backends of the data conversion scripts write 
+    the same compact JSON for the data conversion test data and the JSON_BACKEND_TEST_CASES.
+
+    Parameters
+    ----------
+    test_data: dict
+        The data for the data conversion testing.
+
+    Returns
+    -------
+    str
+        The output string for the test case results.
+    '''
+    sys.path.insert(0, os.path.abspath(os.path.split(test_data['script_path'])[0]))
+    from fmt_lib import misc_functions as misc_fns
+
+    result = 'JSON BACKEND RESULTS:'
+    if misc_fns.orjson is None:
+        result += '\n\tSKIPPED: orjson is not installed'
+        return result
+    test_cases = {}
+    for test in sorted(test_data['data_files']):
+        with open(test, 'r') as f:
+            test_cases[os.path.split(os.path.splitext(test)[0])[1]] = json.load(f)
+    test_cases.update(JSON_BACKEND_TEST_CASES)
+    fail_count = 0
+
+    default_backend = misc_fns.get_json_backend()
+    try:
+        for test_num, (test_name, data) in enumerate(test_cases.items()):
+            serialized = []
+            for backend in misc_fns.JSON_BACKENDS:
+                misc_fns.set_json_backend(backend)
+                serialized.append(misc_fns.dumps_json(data, compact = True))
+            test_result = len(set(serialized)) == 1
+            if not test_result: fail_count += 1
+            result += f"\n\tTEST #{test_num + 1}: {test_name}...RESULT: {'passed' if test_result else 'FAILED'}"
+    finally:
+        misc_fns.set_json_backend(default_backend)
+
+    result += f'\n\tOVERVIEW: Total JSON backend tests failed --> {fail_count}'
+    return result
+
+def write_previous_tsv(source_filepath: str, previous_filepath: str) -> None:
+    ''' Writes the TSV of a previous release for the incremental rebuild tests. The rows of the last 
+    biomarker are removed (so it is new in the source) and the evidence of the first row is changed (so 
+    the first biomarker is changed in the source), when there is more than one biomarker.
+
+    Parameters
+    ----------
+    source_filepath: str
+        File path to the source TSV file.
+    previous_filepath: str
+        File path to write the previous TSV file to.
+    '''
+    with open(source_filepath, 'r') as f:
+        header, *rows = f.read().splitlines()
+    evidence_idx = header.split('\t').index('evidence')
+    last_biomarker_id = rows[-1].split('\t')[0]
+    previous_rows = [row.split('\t') for row in rows if row.split('\t')[0] != last_biomarker_id]
+    if previous_rows:
+        previous_rows[0][evidence_idx] += ' (previous release)'
+    with open(previous_filepath, 'w') as f:
+        f.write('\n'.join([header] + ['\t'.join(row) for row in previous_rows]) + '\n')
+
 def main() -> None:
 
     global _version 
@@ -446,11 +692,26 @@ def main() -> None:
     results += '\n' + validate_data_results
     print(validate_data_results)
 
+    # check that the validate_data.py backends agree
+    validator_agreement_results = validator_agreement_tests(test_data['schema'])
+    results += '\n' + validator_agreement_results
+    print(validator_agreement_results)
+
     # run the data_conversion.py tests
     data_conversion_results = data_conversion_tests(test_data['data_conversion'])
     results += '\n' + data_conversion_results
     print(data_conversion_results)
 
+    # run the data_conversion.py regression tests
+    conversion_regression_results = conversion_regression_tests(test_data['data_conversion'])
+    results += '\n' + conversion_regression_results
+    print(conversion_regression_results)
+
+    # check that the JSON serializer backends agree
+    json_backend_results = json_backend_tests(test_data['data_conversion'])
+    results += '\n' + json_backend_results
+    print(json_backend_results)
+
     # log aggregated results
     logging.info(results)
 